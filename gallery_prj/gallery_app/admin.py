@@ -1,9 +1,17 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
+from django.templatetags.static import static
 from django import forms
-from .models import Service, Booking
+from .models import Service, Booking, BookingArchive, BookingHistory, OutboxEmail, Photo, Tag
+from .transitions import bulk_transition
+from .exports import export_response
+from .search import search_bookings
+from .backends import invalidate_users
+from . import images
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin
+from django.contrib.admin.views.main import ChangeList
+from django.db import transaction
 from django.utils import timezone
 import datetime
 
@@ -26,10 +34,28 @@ class BookingAdminForm(forms.ModelForm):
         self.fields['user'].queryset = User.objects.filter(is_active=True).order_by('username')
 
 
+class BookingChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        # Колонки списка обращаются к service и user, загружаем их одним запросом
+        return super().get_queryset(request, exclude_parameters).for_listing()
+
+
+class BookingHistoryInline(admin.TabularInline):
+    model = BookingHistory
+    fields = ('created_at', 'old_status', 'new_status', 'changed_by')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 # ============ BOOKING ADMIN ============
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     form = BookingAdminForm
+    inlines = [BookingHistoryInline]
     list_display = ('booking_id', 'client_name', 'service', 'booking_date',
                     'booking_time', 'status_display', 'total_price', 'created_at', 'user_info')
     list_filter = ('status', 'booking_date', 'service', 'created_at')
@@ -37,7 +63,7 @@ class BookingAdmin(admin.ModelAdmin):
                      'service__name', 'id', 'user__username', 'user__email')
     readonly_fields = ('id', 'created_at', 'updated_at', 'status_display', 'total_price_display')
     list_per_page = 25
-    actions = ['confirm_bookings', 'reject_bookings', 'complete_bookings']
+    actions = ['confirm_bookings', 'reject_bookings', 'complete_bookings', 'export_csv', 'export_xlsx']
     date_hierarchy = 'booking_date'
 
     fieldsets = (
@@ -103,27 +129,52 @@ class BookingAdmin(admin.ModelAdmin):
     total_price_display.short_description = 'Общая стоимость'
 
     # Кастомные действия для массового изменения статуса
+    def _update_status(self, request, queryset, status, done):
+        result = bulk_transition(queryset, status, user=request.user)
+        self.message_user(request, f"{result.updated} бронирований {done}.")
+        if result.skipped:
+            self.message_user(
+                request, f"{result.skipped} пропущено: переход из их статуса недопустим.", messages.WARNING
+            )
+
     def confirm_bookings(self, request, queryset):
         """Подтвердить выбранные бронирования"""
-        updated = queryset.update(status='confirmed', admin_user=request.user)
-        self.message_user(request, f"{updated} бронирований подтверждено.")
+        self._update_status(request, queryset, 'confirmed', 'подтверждено')
 
     confirm_bookings.short_description = "✅ Подтвердить выбранные бронирования"
 
     def reject_bookings(self, request, queryset):
         """Отклонить выбранные бронирования"""
-        updated = queryset.update(status='rejected', admin_user=request.user)
-        self.message_user(request, f"{updated} бронирований отклонено.")
+        self._update_status(request, queryset, 'rejected', 'отклонено')
 
     reject_bookings.short_description = "❌ Отклонить выбранные бронирования"
 
     def complete_bookings(self, request, queryset):
         """Пометить как выполненные"""
-        updated = queryset.update(status='completed', admin_user=request.user)
-        self.message_user(request, f"{updated} бронирований отмечены как выполненные.")
+        self._update_status(request, queryset, 'completed', 'отмечены как выполненные')
 
     complete_bookings.short_description = "✅ Пометить как выполненные"
 
+    # Выгрузка идет потоком, поэтому годится и для «выбрать все» по всем страницам
+    def export_csv(self, request, queryset):
+        return export_response(queryset, 'csv')
+
+    export_csv.short_description = "📄 Выгрузить в CSV"
+
+    def export_xlsx(self, request, queryset):
+        return export_response(queryset, 'xlsx')
+
+    export_xlsx.short_description = "📊 Выгрузить в Excel (XLSX)"
+
+    def get_changelist(self, request, **kwargs):
+        return BookingChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск идет по индексу токенов вместо icontains по search_fields
+        if not search_term:
+            return queryset, False
+        return search_bookings(queryset, search_term), False
+
     # Фильтрация для не-суперпользователей
     def get_queryset(self, request):
         qs = super().get_queryset(request)
@@ -166,6 +217,24 @@ class BookingAdmin(admin.ModelAdmin):
         js = ('admin/js/booking_admin.js',)
 
 
+# ============ BOOKING ARCHIVE ADMIN ============
+@admin.register(BookingArchive)
+class BookingArchiveAdmin(admin.ModelAdmin):
+    """Архив только для просмотра: записи создает команда archive_bookings"""
+    list_display = ('client_name', 'service', 'booking_date', 'booking_time', 'status', 'archived_at')
+    list_filter = ('status',)
+    date_hierarchy = 'booking_date'
+    search_fields = ('client_name', 'client_email', 'client_phone')
+    list_select_related = ('service',)
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # ============ SERVICE ADMIN ============
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
@@ -226,7 +295,92 @@ class ServiceAdmin(admin.ModelAdmin):
     is_active_badge.short_description = 'Статус'
 
 
+# ============ PHOTO ADMIN ============
+class PhotoAdminForm(forms.ModelForm):
+    class Meta:
+        model = Photo
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metadata = {}
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if self.instance.pk and 'image' not in self.changed_data:
+            return image
+        if '..' in image.split('/'):
+            raise forms.ValidationError('Путь должен указывать на файл внутри static')
+        # Метаданные читаются здесь, чтобы ошибка файла показывалась в форме
+        try:
+            self.metadata = images.photo_metadata(image)
+        except ImportError:
+            raise forms.ValidationError('Для чтения метаданных нужен Pillow: pip install Pillow')
+        except OSError:
+            raise forms.ValidationError('Файл не найден в static или не является изображением')
+        return image
+
+
+@admin.register(Photo)
+class PhotoAdmin(admin.ModelAdmin):
+    form = PhotoAdminForm
+    list_display = ('preview', 'title', 'image', 'dimensions', 'file_size_display',
+                    'captured_at', 'order', 'is_published')
+    list_filter = ('is_published', 'tags')
+    search_fields = ('title', 'image')
+    list_editable = ('order', 'is_published')
+    filter_horizontal = ('tags',)
+    readonly_fields = ('width', 'height', 'file_size', 'dominant_color', 'captured_at', 'created_at')
+    list_per_page = 50
+
+    def preview(self, obj):
+        return format_html('<img src="{}" style="height: 40px; border-radius: 4px;">', static(obj.image))
+
+    preview.short_description = 'Превью'
+
+    def dimensions(self, obj):
+        return f"{obj.width}×{obj.height}"
+
+    dimensions.short_description = 'Размер'
+
+    def file_size_display(self, obj):
+        return f"{obj.file_size // 1024} КБ"
+
+    file_size_display.short_description = 'Файл'
+
+    def save_model(self, request, obj, form, change):
+        for field, value in form.metadata.items():
+            setattr(obj, field, value)
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    search_fields = ('name',)
+
+
+# ============ OUTBOX ADMIN ============
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('to', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to', 'subject')
+    readonly_fields = ('booking', 'created_at', 'sent_at', 'last_error')
+    list_select_related = ('booking',)
+    list_per_page = 50
+
+
 # ============ CUSTOM USER ADMIN ============
+def _update_users(queryset, **fields):
+    """update() без сигналов, поэтому закешированных пользователей сбрасываем сами"""
+    user_ids = list(queryset.values_list('pk', flat=True))
+    updated = queryset.update(**fields)
+    # Сразу и после COMMIT: запрос до фиксации мог закешировать прежнюю строку
+    invalidate_users(user_ids)
+    transaction.on_commit(lambda: invalidate_users(user_ids))
+    return updated
+
+
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name',
                     'is_staff', 'is_active', 'date_joined', 'last_login')
@@ -237,25 +391,25 @@ class CustomUserAdmin(UserAdmin):
     actions = ['activate_users', 'deactivate_users', 'make_staff', 'remove_staff']
 
     def activate_users(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = _update_users(queryset, is_active=True)
         self.message_user(request, f"{updated} пользователей активировано.")
 
     activate_users.short_description = "✅ Активировать выбранных пользователей"
 
     def deactivate_users(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = _update_users(queryset, is_active=False)
         self.message_user(request, f"{updated} пользователей деактивировано.")
 
     deactivate_users.short_description = "❌ Деактивировать выбранных пользователей"
 
     def make_staff(self, request, queryset):
-        updated = queryset.update(is_staff=True)
+        updated = _update_users(queryset, is_staff=True)
         self.message_user(request, f"{updated} пользователей назначены сотрудниками.")
 
     make_staff.short_description = "👑 Назначить сотрудниками"
 
     def remove_staff(self, request, queryset):
-        updated = queryset.update(is_staff=False)
+        updated = _update_users(queryset, is_staff=False)
         self.message_user(request, f"{updated} пользователей удалены из сотрудников.")
 
     remove_staff.short_description = "👑 Убрать из сотрудников"
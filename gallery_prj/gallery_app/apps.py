@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class GalleryAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gallery_app'
+
+    def ready(self):
+        from gallery_prj.database import configure_sqlite
+        from . import signals  # noqa: F401
+        from .profiling import install_template_timing
+
+        connection_created.connect(configure_sqlite, dispatch_uid='gallery_prj.configure_sqlite')
+        install_template_timing()
@@ -0,0 +1,129 @@
+"""Перенос старых завершенных бронирований в архивную таблицу.
+
+Рабочая таблица Booking содержит только актуальные бронирования, поэтому ее
+индексы, статистика и поиск не растут вместе с историей. Выполненные,
+отмененные и отклоненные бронирования старше ARCHIVE_AFTER_DAYS дней команда
+archive_bookings переносит в BookingArchive пачками: каждая пачка - отдельная
+транзакция (INSERT в архив и DELETE из рабочей таблицы), поэтому прерванный
+перенос безопасно продолжить повторным запуском.
+
+Архив читается только когда пользователь просит историю: ChainedRows и
+achained_rows отдают строки рабочей таблицы, а за ними архивные.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import Booking, BookingArchive, BookingHistory
+from .search import tokenize
+
+
+ARCHIVE_STATUSES = ('completed', 'cancelled', 'rejected')
+ARCHIVE_AFTER_DAYS = 180
+BATCH_SIZE = 500
+
+# Поля Booking, которые копируются в архив как есть
+FIELDS = tuple(field.attname for field in Booking._meta.concrete_fields)
+
+
+def archive_cutoff(days=ARCHIVE_AFTER_DAYS):
+    return timezone.now().date() - datetime.timedelta(days=days)
+
+
+def archivable(cutoff):
+    """Бронирования, которые пора перенести в архив"""
+    return Booking.objects.filter(status__in=ARCHIVE_STATUSES, booking_date__lt=cutoff)
+
+
+def _history(ids):
+    history = defaultdict(list)
+    rows = (
+        BookingHistory.objects.filter(booking_id__in=ids)
+        .order_by('created_at', 'id')
+        .values_list('booking_id', 'old_status', 'new_status', 'changed_by_id', 'created_at')
+    )
+    for booking_id, old_status, new_status, changed_by, created_at in rows:
+        history[booking_id].append({
+            'old_status': old_status,
+            'new_status': new_status,
+            'changed_by': changed_by,
+            'created_at': created_at.isoformat(),
+        })
+    return history
+
+
+def archive_batch(cutoff, batch_size=BATCH_SIZE):
+    """Перенос одной пачки в архив; возвращает количество перенесенных бронирований"""
+    with transaction.atomic():
+        rows = list(
+            archivable(cutoff)
+            .select_for_update()
+            .order_by('booking_date', 'id')
+            .values(*FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        ids = [row['id'] for row in rows]
+        history = _history(ids)
+        now = timezone.now()
+        archived = [BookingArchive(**row, history=history[row['id']], archived_at=now) for row in rows]
+        for booking in archived:
+            booking.search_text = ''.join(' ' + token for token in sorted(tokenize(booking)))
+        BookingArchive.objects.bulk_create(archived)
+        # Журнал и поисковые токены удаляются каскадом, у писем очереди
+        # обнуляется ссылка; статистику сбрасывают сигналы удаления
+        Booking.objects.filter(id__in=ids).delete()
+    return len(rows)
+
+
+def _split(first_count, start, stop):
+    """Срез [start, stop) последовательности first + second как срезы каждой из них"""
+    return (
+        (min(start, first_count), min(stop, first_count)),
+        (max(start - first_count, 0), max(stop - first_count, 0)),
+    )
+
+
+class ChainedRows:
+    """Строки двух querysets подряд, для Paginator: рабочая таблица, затем архив"""
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+    @cached_property
+    def first_count(self):
+        return self.first.count()
+
+    def count(self):
+        return self.first_count + self.second.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError('ChainedRows поддерживает только срезы без шага')
+        start, stop = index.start or 0, index.stop
+        if stop is None:
+            stop = self.count()
+        (first_start, first_stop), (second_start, second_stop) = _split(self.first_count, start, stop)
+        rows = list(self.first[first_start:first_stop]) if first_stop > first_start else []
+        if second_stop > second_start:
+            rows += list(self.second[second_start:second_stop])
+        return rows
+
+
+async def achained_rows(first, first_count, second, offset, limit):
+    """Асинхронный срез [offset, offset + limit) строк first, затем second"""
+    (first_start, first_stop), (second_start, second_stop) = _split(first_count, offset, offset + limit)
+    rows = []
+    if first_stop > first_start:
+        rows = [row async for row in first[first_start:first_stop]]
+    if second_stop > second_start:
+        rows += [row async for row in second[second_start:second_stop]]
+    return rows
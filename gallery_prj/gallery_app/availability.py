@@ -0,0 +1,86 @@
+"""Расчет занятости дней и доступных дат для бронирования"""
+import datetime
+from collections import namedtuple
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import Booking
+
+
+# Правила вместимости студии
+MAX_BOOKINGS_PER_DAY = 3        # Максимум 3 съемки в день
+MAX_HOURS_PER_DAY = 8           # Максимум 8 часов съемок в день
+CLOSED_WEEKDAYS = (6,)          # Съемки не проводятся по воскресеньям
+MIN_LEAD_DAYS = 2               # Бронирование минимум за 48 часов
+BOOKING_WINDOW_DAYS = 90        # Бронирование доступно на 3 месяца вперед
+OPENING_TIME = datetime.time(9, 0)      # Рабочее время с 9:00
+LAST_START_TIME = datetime.time(21, 0)  # Последнее время начала съемки
+
+# Статусы, которые занимают место в расписании
+BLOCKING_STATUSES = ('confirmed', 'pending')
+# Статусы, часы которых учитываются в лимите часов
+HOURS_STATUSES = ('confirmed',)
+
+DayOccupancy = namedtuple('DayOccupancy', ['bookings', 'hours'])
+EMPTY_DAY = DayOccupancy(0, 0)
+
+
+def get_occupancy(start_date, end_date):
+    """Занятость по дням в диапазоне [start_date, end_date] одним запросом"""
+    rows = (
+        Booking.objects
+        .filter(
+            booking_date__gte=start_date,
+            booking_date__lte=end_date,
+            status__in=BLOCKING_STATUSES,
+        )
+        .order_by()
+        .values('booking_date')
+        .annotate(
+            bookings=Count('id'),
+            hours=Sum('duration', filter=Q(status__in=HOURS_STATUSES)),
+        )
+    )
+    return {
+        row['booking_date']: DayOccupancy(row['bookings'], row['hours'] or 0)
+        for row in rows
+    }
+
+
+def is_open_day(date, today=None):
+    """Проверка правил календаря: срок подготовки и выходные"""
+    today = today or timezone.now().date()
+    if date < today + datetime.timedelta(days=MIN_LEAD_DAYS):
+        return False
+    return date.weekday() not in CLOSED_WEEKDAYS
+
+
+def has_capacity(occupancy):
+    """Проверка лимитов на количество съемок и часов в день"""
+    return (occupancy.bookings < MAX_BOOKINGS_PER_DAY
+            and occupancy.hours < MAX_HOURS_PER_DAY)
+
+
+def get_available_dates(today=None):
+    """Получение доступных дат для бронирования"""
+    today = today or timezone.now().date()
+    start_date = today + datetime.timedelta(days=MIN_LEAD_DAYS)
+    end_date = today + datetime.timedelta(days=BOOKING_WINDOW_DAYS)
+
+    occupancy = get_occupancy(start_date, end_date)
+
+    available_dates = []
+    current_date = start_date
+    while current_date <= end_date:
+        if is_open_day(current_date, today) and has_capacity(occupancy.get(current_date, EMPTY_DAY)):
+            available_dates.append(current_date)
+        current_date += datetime.timedelta(days=1)
+
+    return available_dates
+
+
+def check_date_availability(date):
+    """Проверка доступности даты"""
+    occupancy = get_occupancy(date, date).get(date, EMPTY_DAY)
+    return has_capacity(occupancy)
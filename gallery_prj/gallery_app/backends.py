@@ -0,0 +1,75 @@
+"""Вход по имени пользователя или email с одной проверкой пароля.
+
+Email ищется без учета регистра по индексу на LOWER(email) (миграция
+0011_user_email_index): условие строится как LOWER(email) = 'значение', а не
+через iexact, который в SQLite превращается в LIKE и индекс не использует.
+
+Пользователь сессии, которого AuthenticationMiddleware загружает на каждом
+запросе, берется из кеша; запись сбрасывается сигналами User при любом
+сохранении, в том числе при смене пароля. Массовые изменения через
+queryset.update() сигналов не отправляют и сбрасывают кеш через invalidate_users.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.functions import Lower
+from django.db.models.lookups import Exact
+
+
+def users_with_email(email):
+    """Пользователи с email без учета регистра"""
+    return User.objects.filter(Exact(Lower('email'), email.lower()))
+
+
+def _user_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def invalidate_user(user_id):
+    cache.delete(_user_key(user_id))
+
+
+def invalidate_users(user_ids):
+    """Сброс кеша для пользователей, измененных через queryset.update()"""
+    cache.delete_many([_user_key(user_id) for user_id in user_ids])
+
+
+class EmailBackend(ModelBackend):
+    """ModelBackend, который принимает email вместо имени пользователя"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None or password is None or '@' not in username:
+            return super().authenticate(request, username, password, **kwargs)
+
+        user = users_with_email(username).order_by('pk').first()
+        if user is None:
+            # Хеш все равно считается, чтобы время ответа не выдавало наличие email
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        # Асинхронный ModelBackend не знает про email, поэтому через синхронный путь
+        return await sync_to_async(self.authenticate)(request, username, password, **kwargs)
+
+    def get_user(self, user_id):
+        key = _user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.USER_CACHE_TTL)
+        return user
+
+    async def aget_user(self, user_id):
+        key = _user_key(user_id)
+        user = await cache.aget(key)
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is not None:
+                await cache.aset(key, user, settings.USER_CACHE_TTL)
+        return user
@@ -0,0 +1,428 @@
+"""Бенчмарк горячих путей бронирования и галереи.
+
+Каждый сценарий выполняется через тестовый клиент Django: несколько прогревочных
+запросов, затем замеры времени (перцентили), числа запросов к БД и пикового
+объема памяти (tracemalloc, отдельным запросом, чтобы не искажать время).
+Результат - JSON, который можно сравнить с результатом другого коммита.
+
+load_test() сравнивает пропускную способность синхронного (WSGI) и
+асинхронного (ASGI) обработчика при одновременных запросах: потоки с Client
+против корутин с AsyncClient на одних и тех же страницах.
+
+contention() нагружает базу одновременными читателями и писателями и сравнивает
+исходный режим SQLite (журнал DELETE) с настроенным (WAL и прагмы из
+SQLITE_PRAGMAS): пропускная способность, p99 и ошибки блокировки.
+
+run() и load_test() выключают выборочные замеры PerformanceMiddleware и его
+логи: обертка execute_wrapper и записи в лог исказили бы перцентили, а строки
+лога смешались бы с отчетом.
+"""
+import asyncio
+import datetime
+import logging
+import platform
+import statistics
+import subprocess
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import django
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.db import OperationalError, connection, connections, transaction
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from . import profiling, slots
+from .availability import get_available_dates
+from .models import Booking, Service
+
+
+SCALES = {
+    'small': {'bookings': 1_000, 'users': 1_000},
+    'medium': {'bookings': 100_000, 'users': 10_000},
+    'large': {'bookings': 1_000_000, 'users': 10_000},
+}
+
+ADMIN_USERNAME = 'benchmark-admin'
+LOGIN_USERNAME = 'benchmark-login'
+LOGIN_PASSWORD = 'benchmark-password'
+
+# Ожидаемый статус ответа сценария, по умолчанию 200: замер страницы с ошибкой
+# или отклоненной формы ничего не говорит о производительности
+EXPECTED_STATUSES = {
+    'login': 302,
+    'create_booking': 302,
+}
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class ScenarioSkipped(Exception):
+    """Сценарий нельзя выполнить на этих данных; прогон продолжается без него"""
+
+
+# Страницы с async-вариантами view; признак - нужен ли вход
+LOAD_SCENARIOS = (
+    ('home', '/', False),
+    ('prices', '/prices/', False),
+    ('gallery', '/gallery/', False),
+    ('user_bookings', '/booking/my/', True),
+    ('user_stats', '/booking/my/stats/', True),
+)
+
+
+def _booking_form_data():
+    """Данные формы бронирования по номеру итерации: по одному свободному слоту на доступную дату"""
+    service = Service.objects.filter(can_be_booked=True, is_active=True).order_by('pk').first()
+    # Каждая итерация создает бронирование, поэтому дата используется один раз:
+    # на доступной дате гарантированно есть место только для одной съемки
+    free = []
+    for day in get_available_dates():
+        times = slots.suggest_free_slots(day, service.min_booking_hours, service.preparation_time,
+                                         near=datetime.time(12, 0), limit=1)
+        if times:
+            free.append((day, times[0]))
+
+    def data(iteration):
+        if iteration >= len(free):
+            raise ScenarioSkipped(f'свободных дат {len(free)}, нужно не меньше {iteration + 1}')
+        day, start = free[iteration]
+        return {
+            'service': service.pk,
+            'booking_date': day.isoformat(),
+            'booking_time': start.strftime('%H:%M'),
+            'duration': service.min_booking_hours,
+            'client_name': 'Бенчмарк',
+            'client_phone': '+7 999 000-00-00',
+            'client_email': 'benchmark@example.com',
+            'confirm_terms': 'on',
+        }
+    return data
+
+
+class _VisitorClient(Client):
+    """Каждый запрос - от нового посетителя без cookie, чтобы вход выполнялся заново"""
+
+    def request(self, **request):
+        self.cookies.clear()
+        return super().request(**request)
+
+
+def _login_data(iteration):
+    # Через раз - по email, чтобы замер покрывал оба пути входа
+    username = LOGIN_USERNAME if iteration % 2 else f'{LOGIN_USERNAME}@example.com'
+    return {'username': username, 'password': LOGIN_PASSWORD}
+
+
+def scenarios():
+    """Имя, метод, адрес и функция данных запроса по номеру итерации"""
+    today = timezone.localdate()
+    return [
+        ('home', 'get', '/', None),
+        ('login', 'post', '/login/', _login_data),
+        ('gallery', 'get', '/gallery/', None),
+        ('create_booking_form', 'get', '/booking/create/', None),
+        ('create_booking', 'post', '/booking/create/', _booking_form_data()),
+        ('user_bookings', 'get', '/booking/my/', None),
+        ('admin_booking_list', 'get', '/admin/bookings/', None),
+        ('admin_booking_search', 'get', '/admin/bookings/', lambda i: {'search': 'иванова'}),
+        ('admin_calendar', 'get', '/admin/calendar/', lambda i: {'year': today.year, 'month': today.month}),
+    ]
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def measure(client, method, url, data=None, iterations=20, warmup=3):
+    send = getattr(client, method)
+    # Данные готовятся заранее, чтобы их запросы не попали в замер
+    payloads = [data(iteration) if data else None for iteration in range(warmup + iterations + 1)]
+
+    for payload in payloads[:warmup]:
+        send(url, payload)
+
+    timings, queries, statuses = [], [], set()
+    for payload in payloads[warmup:-1]:
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = send(url, payload)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured))
+        statuses.add(response.status_code)
+
+    tracemalloc.start()
+    try:
+        send(url, payloads[-1])
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'statuses': sorted(statuses),
+        'p50_ms': round(_percentile(timings, 0.5), 3),
+        'p90_ms': round(_percentile(timings, 0.9), 3),
+        'p99_ms': round(_percentile(timings, 0.99), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'queries': round(statistics.fmean(queries), 2),
+        'max_queries': max(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def _load_summary(timings, statuses, elapsed):
+    return {
+        'requests': len(timings),
+        'statuses': sorted(statuses),
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(_percentile(timings, 0.5), 3),
+        'p99_ms': round(_percentile(timings, 0.99), 3),
+    }
+
+
+def _load_plan(requests):
+    return [LOAD_SCENARIOS[number % len(LOAD_SCENARIOS)] for number in range(requests)]
+
+
+def load_wsgi(user, requests=200, concurrency=8):
+    """Запросы из concurrency потоков через синхронный обработчик"""
+    plan = _load_plan(requests)
+
+    def worker(part):
+        anonymous, customer = Client(raise_request_exception=False), Client(raise_request_exception=False)
+        customer.force_login(user)
+        results = []
+        try:
+            for _, url, login in part:
+                start = time.perf_counter()
+                response = (customer if login else anonymous).get(url)
+                results.append(((time.perf_counter() - start) * 1000, response.status_code))
+        finally:
+            # У каждого потока свое соединение с БД
+            connections.close_all()
+        return results
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        parts = executor.map(worker, [plan[index::concurrency] for index in range(concurrency)])
+        results = [result for part in parts for result in part]
+    elapsed = time.perf_counter() - start
+    return _load_summary([timing for timing, _ in results], {status for _, status in results}, elapsed)
+
+
+def load_asgi(user, requests=200, concurrency=8):
+    """Те же запросы из concurrency корутин через асинхронный обработчик"""
+    plan = _load_plan(requests)
+
+    async def main():
+        anonymous, customer = AsyncClient(raise_request_exception=False), AsyncClient(raise_request_exception=False)
+        await customer.aforce_login(user)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def send(url, login):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await (customer if login else anonymous).get(url)
+                return (time.perf_counter() - start) * 1000, response.status_code
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(send(url, login) for _, url, login in plan))
+        return results, time.perf_counter() - start
+
+    # Синхронные участки async-view выполняются в одном потоке, как под ASGI-сервером
+    results, elapsed = async_to_sync(main)()
+    return _load_summary([timing for timing, _ in results], {status for _, status in results}, elapsed)
+
+
+@contextmanager
+def _without_profiling():
+    level = profiling.logger.level
+    # Медленные запросы логируются с уровнем WARNING независимо от выборки
+    profiling.logger.setLevel(logging.CRITICAL)
+    try:
+        with override_settings(PERF_SAMPLE_RATE=0, PERF_SERVER_TIMING=False):
+            yield
+    finally:
+        profiling.logger.setLevel(level)
+
+
+@_without_profiling()
+def load_test(requests=200, concurrency=8):
+    """Пропускная способность WSGI и ASGI на одинаковом наборе запросов"""
+    user = User.objects.filter(booking__isnull=False).order_by('pk').first()
+    if user is None:
+        user, _ = User.objects.get_or_create(username=ADMIN_USERNAME)
+    # Прогрев: шаблоны, кеш страниц, подключение к БД
+    load_wsgi(user, len(LOAD_SCENARIOS), 1)
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'wsgi': load_wsgi(user, requests, concurrency),
+        'asgi': load_asgi(user, requests, concurrency),
+    }
+
+
+# Исходный режим SQLite для сравнения с настроенным
+ROLLBACK_JOURNAL_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+CONTENTION_CLIENT = 'Нагрузка'
+
+
+def _contention_round(writers, readers, duration):
+    service = Service.objects.order_by('pk').first()
+    user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True)[:max(writers, 1)])
+    first_day = timezone.localdate() + datetime.timedelta(days=30)
+    timings = {'read': [], 'write': []}
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(writers + readers)
+
+    def write(number):
+        booking = Booking(user_id=user_ids[number % len(user_ids)], service=service, duration=1,
+                          client_name=CONTENTION_CLIENT, client_phone='+7 999 000-00-00',
+                          client_email='load@example.com', status='pending')
+        booking.booking_date = first_day + datetime.timedelta(days=number % 60)
+        booking.booking_time = datetime.time(9 + number % 10)
+        # Сохранение с сигналами, как в create_booking: индекс дней, поиск, статистика
+        with transaction.atomic():
+            booking.save()
+
+    def read(_):
+        get_available_dates()
+        list(Booking.objects.for_listing().order_by('-created_at')[:20])
+
+    def worker(kind, action, offset):
+        try:
+            barrier.wait()
+            stop = time.perf_counter() + duration
+            number = offset
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                try:
+                    action(number)
+                except OperationalError as error:
+                    # Например, "database is locked" после истечения busy_timeout
+                    with lock:
+                        errors.append(str(error))
+                else:
+                    with lock:
+                        timings[kind].append((time.perf_counter() - start) * 1000)
+                number += writers + readers
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=('write', write, index)) for index in range(writers)]
+    threads += [threading.Thread(target=worker, args=('read', read, writers + index)) for index in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result = {'errors': len(errors), 'error_samples': sorted(set(errors))[:3]}
+    for kind, values in timings.items():
+        result[f'{kind}s_per_second'] = round(len(values) / duration, 1)
+        result[f'{kind}_p50_ms'] = round(_percentile(values, 0.5), 3) if values else None
+        result[f'{kind}_p99_ms'] = round(_percentile(values, 0.99), 3) if values else None
+    return result
+
+
+def _reconnect():
+    # Режим журнала меняется только когда к файлу нет других соединений
+    connections.close_all()
+    connection.ensure_connection()
+
+
+def contention(writers=4, readers=8, duration=5.0):
+    """Одновременные чтения и записи в исходном и настроенном режиме SQLite"""
+    results = {}
+    if connection.vendor == 'sqlite':
+        with override_settings(SQLITE_PRAGMAS={**settings.SQLITE_PRAGMAS, **ROLLBACK_JOURNAL_PRAGMAS}):
+            _reconnect()
+            results['rollback_journal'] = _contention_round(writers, readers, duration)
+        _reconnect()
+    results['configured'] = _contention_round(writers, readers, duration)
+    return {'database': connection.vendor, 'writers': writers, 'readers': readers, 'duration': duration,
+            'results': results}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@_without_profiling()
+def run(iterations=20, warmup=3, only=None):
+    """Прогон сценариев на уже заполненной базе"""
+    admin, _ = User.objects.get_or_create(
+        username=ADMIN_USERNAME, defaults={'is_staff': True, 'is_superuser': True}
+    )
+    # Пользователь с бронированиями, чтобы user_bookings не был пустым
+    customer = User.objects.filter(booking__isnull=False).order_by('pk').first() or admin
+    # Пароль хешируется настроенным хешером, как у настоящих пользователей
+    if not User.objects.filter(username=LOGIN_USERNAME).exists():
+        User.objects.create_user(LOGIN_USERNAME, f'{LOGIN_USERNAME}@example.com', LOGIN_PASSWORD)
+
+    results, skipped = {}, {}
+    for name, method, url, data in scenarios():
+        if only and name not in only:
+            continue
+        # Ошибка view попадает в статусы результата и прерывает прогон после сценария
+        if name == 'login':
+            client = _VisitorClient(raise_request_exception=False)
+        else:
+            client = Client(raise_request_exception=False)
+            client.force_login(customer if name in ('user_bookings', 'create_booking') else admin)
+        try:
+            results[name] = measure(client, method, url, data, iterations, warmup)
+        except ScenarioSkipped as error:
+            skipped[name] = str(error)
+            continue
+        expected = EXPECTED_STATUSES.get(name, 200)
+        if results[name]['statuses'] != [expected]:
+            raise BenchmarkError(f'{name}: статусы {results[name]["statuses"]}, ожидался {expected}')
+
+    if 'login' in results:
+        # Запросы идут последовательно, поэтому это входы в секунду на одно ядро
+        results['login']['per_second'] = round(1000 / results['login']['mean_ms'], 1)
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'iterations': iterations,
+        },
+        'results': results,
+        'skipped': skipped,
+    }
+
+
+def compare(baseline, current):
+    """Отношение текущих метрик к базовым по сценариям, общим для обоих прогонов"""
+    rows = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        rows.append({
+            'scenario': name,
+            'p50_ratio': round(result['p50_ms'] / before['p50_ms'], 2) if before['p50_ms'] else None,
+            'p99_ratio': round(result['p99_ms'] / before['p99_ms'], 2) if before['p99_ms'] else None,
+            'queries_delta': round(result['queries'] - before['queries'], 2),
+        })
+    return rows
@@ -0,0 +1,163 @@
+"""Календарь бронирований для администратора.
+
+Месяц и неделя строятся только по сводке дней в DaySchedule (количество
+подтвержденных съемок, часы, первый и последний слот), которую
+slots.rebuild_days обновляет при каждом изменении бронирований. Сами
+бронирования загружаются только для просмотра дня и для iCalendar, одним
+запросом по индексу (status, booking_date, booking_time).
+"""
+import calendar
+import datetime
+from functools import lru_cache
+
+from django.utils import timezone
+
+from . import slots
+from .availability import HOURS_STATUSES
+from .models import Booking, DaySchedule
+
+
+MONTH = 'month'
+WEEK = 'week'
+DAY = 'day'
+VIEWS = (MONTH, WEEK, DAY)
+
+# Ограничение диапазона для JSON и iCalendar
+MAX_FEED_DAYS = 366
+
+ONE_DAY = datetime.timedelta(days=1)
+
+
+@lru_cache(maxsize=64)
+def month_weeks(year, month):
+    """Недели месяца (понедельник - воскресенье) как кортежи дат"""
+    return tuple(tuple(week) for week in calendar.Calendar().monthdatescalendar(year, month))
+
+
+def month_bounds(year, month):
+    start = datetime.date(year, month, 1)
+    return start, datetime.date(year + month // 12, month % 12 + 1, 1)
+
+
+def week_bounds(day):
+    start = day - datetime.timedelta(days=day.weekday())
+    return start, start + datetime.timedelta(days=7)
+
+
+class DaySummary:
+    """Сводка дня календаря"""
+
+    __slots__ = ('date', 'bookings', 'hours', 'first_slot', 'last_slot')
+
+    def __init__(self, date, bookings=0, hours=0, first_slot=None, last_slot=None):
+        self.date = date
+        self.bookings = bookings
+        self.hours = hours
+        self.first_slot = first_slot
+        self.last_slot = last_slot
+
+    @property
+    def start(self):
+        return None if self.first_slot is None else slots.slot_to_time(self.first_slot)
+
+    @property
+    def end(self):
+        return None if self.last_slot is None else slots.slot_to_time(self.last_slot + 1)
+
+    def as_dict(self):
+        return {
+            'date': self.date.isoformat(),
+            'bookings': self.bookings,
+            'hours': self.hours,
+            'start': self.start.strftime('%H:%M') if self.start else None,
+            'end': self.end.strftime('%H:%M') if self.end else None,
+        }
+
+
+def get_summaries(start, end):
+    """Сводки дней в [start, end) с подтвержденными съемками; один запрос"""
+    rows = DaySchedule.objects.filter(date__gte=start, date__lt=end, confirmed__gt=0).values_list(
+        'date', 'confirmed', 'hours', 'first_slot', 'last_slot'
+    )
+    return {row[0]: DaySummary(*row) for row in rows}
+
+
+def _with_summaries(days, summaries):
+    return [summaries.get(day) or DaySummary(day) for day in days]
+
+
+def month_view(year, month):
+    weeks = month_weeks(year, month)
+    summaries = get_summaries(weeks[0][0], weeks[-1][-1] + ONE_DAY)
+    return [_with_summaries(week, summaries) for week in weeks]
+
+
+def week_view(day):
+    start, end = week_bounds(day)
+    days = [start + datetime.timedelta(days=offset) for offset in range(7)]
+    return _with_summaries(days, get_summaries(start, end))
+
+
+def get_bookings(start, end):
+    """Подтвержденные бронирования в [start, end) с услугой и клиентом"""
+    return Booking.objects.for_listing().filter(
+        status__in=HOURS_STATUSES,
+        booking_date__gte=start,
+        booking_date__lt=end,
+    ).order_by('booking_date', 'booking_time')
+
+
+def day_view(day):
+    return get_bookings(day, day + ONE_DAY)
+
+
+def parse_range(start, end, today=None):
+    """Диапазон фида из параметров запроса; по умолчанию текущий месяц"""
+    today = today or timezone.localdate()
+    try:
+        start = datetime.date.fromisoformat(start) if start else today.replace(day=1)
+        end = datetime.date.fromisoformat(end) if end else month_bounds(start.year, start.month)[1]
+    except ValueError:
+        raise ValueError('Даты должны быть в формате ГГГГ-ММ-ДД')
+    if end <= start:
+        raise ValueError('Конец диапазона должен быть позже начала')
+    if (end - start).days > MAX_FEED_DAYS:
+        raise ValueError(f'Диапазон не может быть больше {MAX_FEED_DAYS} дней')
+    return start, end
+
+
+def _ics_escape(value):
+    return (str(value).replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+
+def _ics_datetime(day, time):
+    moment = timezone.make_aware(datetime.datetime.combine(day, time))
+    return moment.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def to_ical(bookings, host):
+    """Текст iCalendar (RFC 5545) для бронирований"""
+    stamp = timezone.now().astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//PhotoGal//Bookings//RU',
+        'CALSCALE:GREGORIAN',
+    ]
+    for booking in bookings:
+        start = datetime.datetime.combine(booking.booking_date, booking.booking_time)
+        end = start + datetime.timedelta(hours=booking.duration)
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:{booking.id}@{host}',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART:{_ics_datetime(start.date(), start.time())}',
+            f'DTEND:{_ics_datetime(end.date(), end.time())}',
+            f'SUMMARY:{_ics_escape(f"{booking.service.name}: {booking.client_name}")}',
+            f'LOCATION:{_ics_escape(booking.location or "")}',
+            f'DESCRIPTION:{_ics_escape(booking.client_phone)}',
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(lines) + '\r\n'
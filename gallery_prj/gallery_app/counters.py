@@ -0,0 +1,39 @@
+"""Счетчик пользователей, поддерживаемый сигналами User"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db.models import F
+
+from .models import SiteCounter
+
+
+def get_user_count():
+    """Количество пользователей одним чтением по уникальному ключу"""
+    value = SiteCounter.objects.filter(name=SiteCounter.USERS).values_list('value', flat=True).first()
+    if value is None:
+        value = reconcile_user_count()[1]
+    return value
+
+
+async def aget_user_count():
+    """Асинхронный вариант get_user_count"""
+    value = await SiteCounter.objects.filter(name=SiteCounter.USERS).values_list('value', flat=True).afirst()
+    if value is None:
+        value = (await sync_to_async(reconcile_user_count)())[1]
+    return value
+
+
+def add_users(delta):
+    updated = SiteCounter.objects.filter(name=SiteCounter.USERS).update(value=F('value') + delta)
+    if not updated:
+        reconcile_user_count()
+
+
+def reconcile_user_count():
+    """Пересчет счетчика по таблице; возвращает (старое, новое) значение"""
+    actual = User.objects.count()
+    counter, created = SiteCounter.objects.get_or_create(name=SiteCounter.USERS, defaults={'value': actual})
+    previous = None if created else counter.value
+    if not created and counter.value != actual:
+        counter.value = actual
+        counter.save(update_fields=['value', 'updated_at'])
+    return previous, actual
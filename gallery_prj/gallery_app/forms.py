@@ -3,6 +3,9 @@ from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from .models import Booking, Service
+from . import availability, slots
+from .backends import users_with_email
+from .profiling import track
 from django.utils import timezone
 import datetime
 
@@ -40,7 +43,7 @@ class CustomUserCreationForm(UserCreationForm):
 
     def clean_email(self):
         email = self.cleaned_data.get('email')
-        if User.objects.filter(email=email).exists():
+        if users_with_email(email).exists():
             raise ValidationError('Этот email уже используется')
         return email
 
@@ -65,15 +68,10 @@ class CustomAuthenticationForm(AuthenticationForm):
             'placeholder': 'Введите пароль'
         })
 
-    def clean_username(self):
-        username = self.cleaned_data.get('username')
-        if '@' in username:
-            try:
-                user = User.objects.get(email=username)
-                return user.username
-            except User.DoesNotExist:
-                raise ValidationError('Неверный email или пароль')
-        return username
+    def clean(self):
+        # Email вместо имени принимает EmailBackend; пароль проверяется один раз здесь
+        with track('auth'):
+            return super().clean()
 
     class BookingForm(forms.ModelForm):
         """Форма для создания бронирования"""
@@ -307,12 +305,12 @@ class BookingForm(forms.ModelForm):
                 raise ValidationError('Нельзя выбрать прошедшую дату')
 
             # Нельзя бронировать на ближайшие 2 дня (минимум 48 часов на подготовку)
-            min_date = timezone.now().date() + datetime.timedelta(days=2)
+            min_date = timezone.now().date() + datetime.timedelta(days=availability.MIN_LEAD_DAYS)
             if booking_date < min_date:
                 raise ValidationError('Бронирование возможно минимум за 48 часов')
 
             # Проверяем, не воскресенье ли
-            if booking_date.weekday() == 6:  # 6 = воскресенье
+            if booking_date.weekday() in availability.CLOSED_WEEKDAYS:
                 raise ValidationError('Съемки не проводятся по воскресеньям')
 
         return booking_date
@@ -337,15 +335,25 @@ class BookingForm(forms.ModelForm):
         booking_time = cleaned_data.get('booking_time')
 
         if booking_date and booking_time:
-            booking_datetime = datetime.datetime.combine(booking_date, booking_time)
-
             # Рабочее время с 9:00 до 21:00
-            start_time = datetime.time(9, 0)
-            end_time = datetime.time(21, 0)
-
-            if booking_time < start_time or booking_time > end_time:
+            if booking_time < availability.OPENING_TIME or booking_time > availability.LAST_START_TIME:
                 self.add_error('booking_time', 'Съемки проводятся с 9:00 до 21:00')
 
+        # Проверяем, что время вместе с подготовкой не пересекается с другими съемками
+        service = cleaned_data.get('service')
+        duration = cleaned_data.get('duration')
+
+        if booking_date and booking_time and service and duration and not self.errors:
+            if not slots.is_free(booking_date, booking_time, duration, service.preparation_time):
+                free_times = slots.suggest_free_slots(
+                    booking_date, duration, service.preparation_time, near=booking_time
+                )
+                if free_times:
+                    suggestions = ', '.join(t.strftime('%H:%M') for t in free_times)
+                    self.add_error('booking_time', f'Это время уже занято. Свободное время: {suggestions}')
+                else:
+                    self.add_error('booking_date', 'На эту дату нет свободного времени такой продолжительности')
+
         return cleaned_data
 
 
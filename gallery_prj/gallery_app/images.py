@@ -0,0 +1,155 @@
+"""Адаптивные варианты изображений галереи.
+
+Команда build_gallery_images уменьшает каждое изображение из static/images до
+нескольких ширин и сохраняет их в AVIF (если Pillow его поддерживает), WebP и
+JPEG с хешем содержимого в имени файла. Результат описывается manifest.json,
+по которому тег {% responsive_image %} строит srcset.
+"""
+import datetime
+import hashlib
+import io
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils import timezone
+
+
+SOURCE_DIR = 'images'
+OUTPUT_DIR = 'variants'
+MANIFEST_NAME = 'manifest.json'
+
+VARIANT_WIDTHS = (320, 480, 800, 1280)
+# Порядок важен: браузер берет первый поддерживаемый <source>
+FORMATS = (
+    ('avif', 'AVIF', 'image/avif', {'quality': 55}),
+    ('webp', 'WEBP', 'image/webp', {'quality': 78, 'method': 6}),
+    ('jpg', 'JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+FALLBACK_FORMAT = 'jpg'
+
+
+def static_root():
+    """Каталог статики проекта, из которого берутся оригиналы"""
+    return Path(settings.STATICFILES_DIRS[0])
+
+
+def manifest_path():
+    return static_root() / OUTPUT_DIR / MANIFEST_NAME
+
+
+def _hash(data, length=10):
+    return hashlib.sha256(data).hexdigest()[:length]
+
+
+def available_formats():
+    from PIL import features
+
+    return [fmt for fmt in FORMATS
+            if fmt[0] != 'avif' or features.check('avif')]
+
+
+def build_variants(source, output_dir, previous=None, force=False):
+    """Варианты одного изображения; возвращает запись манифеста"""
+    from PIL import Image
+
+    data = source.read_bytes()
+    source_hash = _hash(data)
+    if (not force and previous and previous.get('source_hash') == source_hash
+            and all((output_dir.parent / v['url']).exists()
+                    for variants in previous['variants'].values() for v in variants)):
+        return previous, False
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGB')
+        width, height = image.size
+        widths = [w for w in VARIANT_WIDTHS if w < width] + [width]
+
+        entry = {'width': width, 'height': height, 'source_hash': source_hash, 'variants': {}}
+        for ext, pil_format, _, options in available_formats():
+            variants = []
+            for target_width in widths:
+                target_height = round(height * target_width / width)
+                resized = image if target_width == width else image.resize(
+                    (target_width, target_height), Image.LANCZOS
+                )
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, **options)
+                content = buffer.getvalue()
+
+                name = f'{source.stem}-{target_width}.{_hash(content)}.{ext}'
+                (output_dir / name).write_bytes(content)
+                variants.append({
+                    'url': f'{OUTPUT_DIR}/{name}',
+                    'width': target_width,
+                    'height': target_height,
+                    'bytes': len(content),
+                })
+            entry['variants'][ext] = variants
+    return entry, True
+
+
+def grid_variant(entry, min_width=480):
+    """Самый компактный вариант достаточной ширины в лучшем доступном формате"""
+    ext = next(fmt[0] for fmt in FORMATS if fmt[0] in entry['variants'])
+    variants = entry['variants'][ext]
+    return next((v for v in variants if v['width'] >= min_width), variants[-1])
+
+
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+
+
+def _parse_exif_date(value):
+    try:
+        captured = datetime.datetime.strptime(str(value).strip(), '%Y:%m:%d %H:%M:%S')
+    except ValueError:
+        return None
+    return timezone.make_aware(captured)
+
+
+def extract_metadata(source):
+    """Размеры, размер файла, основной цвет и дата съемки из EXIF"""
+    from PIL import Image
+
+    with Image.open(source) as image:
+        width, height = image.size
+        exif = image.getexif()
+        captured = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+        # Усреднение до одного пикселя дает основной цвет для заглушки до загрузки
+        red, green, blue = image.convert('RGB').resize((1, 1), Image.BOX).getpixel((0, 0))
+
+    return {
+        'width': width,
+        'height': height,
+        'file_size': source.stat().st_size,
+        'dominant_color': f'#{red:02x}{green:02x}{blue:02x}',
+        'captured_at': _parse_exif_date(captured) if captured else None,
+    }
+
+
+def photo_metadata(image):
+    """Метаданные фотографии по ее пути в static, как он хранится в Photo.image"""
+    return extract_metadata(static_root() / image)
+
+
+def srcset(variants):
+    return ', '.join(f"{static(v['url'])} {v['width']}w" for v in variants)
+
+
+def load_manifest():
+    """Манифест вариантов; перечитывается только при изменении файла"""
+    path = manifest_path()
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return {}
+    if _manifest_cache.get('mtime') != mtime:
+        _manifest_cache['data'] = json.loads(path.read_text(encoding='utf-8'))
+        _manifest_cache['mtime'] = mtime
+    return _manifest_cache['data']
+
+
+_manifest_cache = {}
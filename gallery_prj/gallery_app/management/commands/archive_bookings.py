@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from gallery_app import archive
+
+
+class Command(BaseCommand):
+    help = ('Переносит выполненные, отмененные и отклоненные бронирования старше --days дней '
+            'в архив пачками; прерванный перенос продолжается повторным запуском')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=archive.ARCHIVE_AFTER_DAYS,
+                            help='Архивировать бронирования с датой съемки старше стольких дней')
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE,
+                            help='Бронирований в одной транзакции')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только посчитать, сколько бронирований будет перенесено')
+
+    def handle(self, *args, **options):
+        cutoff = archive.archive_cutoff(options['days'])
+        if options['dry_run']:
+            count = archive.archivable(cutoff).count()
+            self.stdout.write(f'К переносу: {count} (съемки до {cutoff:%d.%m.%Y})')
+            return
+
+        total = 0
+        while True:
+            moved = archive.archive_batch(cutoff, options['batch_size'])
+            total += moved
+            if moved:
+                self.stdout.write(f'  перенесено {moved}, всего {total}')
+            if moved < options['batch_size']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f'Готово: в архив перенесено {total}'))
@@ -0,0 +1,125 @@
+import json
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from gallery_app import benchmark, seeding
+from gallery_app.models import Booking
+
+
+@contextmanager
+def test_database(keepdb=False):
+    """Отдельная тестовая база, рабочая база не затрагивается"""
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+class Command(BaseCommand):
+    help = ('Заполняет отдельную тестовую базу синтетическими данными и замеряет основные страницы: '
+            'перцентили времени, запросы к БД и пиковую память')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(benchmark.SCALES), default='small',
+                            help='Объем данных: small (1k), medium (100k) или large (1M бронирований)')
+        parser.add_argument('--bookings', type=int, help='Количество бронирований вместо --scale')
+        parser.add_argument('--users', type=int, help='Количество пользователей вместо --scale')
+        parser.add_argument('--seed', type=int, default=0, help='Seed генератора данных')
+        parser.add_argument('--iterations', type=int, default=20, help='Замеров на сценарий')
+        parser.add_argument('--warmup', type=int, default=3, help='Прогревочных запросов на сценарий')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help='Запустить только указанный сценарий (можно несколько раз)')
+        parser.add_argument('--output', help='Файл для JSON-результата')
+        parser.add_argument('--compare', help='JSON-результат другого прогона для сравнения')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Не удалять тестовую базу; заполненная база используется повторно')
+        parser.add_argument('--load', action='store_true',
+                            help='Вместо сценариев сравнить пропускную способность WSGI и ASGI')
+        parser.add_argument('--contention', action='store_true',
+                            help='Одновременные чтения и записи: журнал DELETE против WAL и прагм')
+        parser.add_argument('--writers', type=int, default=4, help='Пишущих потоков в --contention')
+        parser.add_argument('--readers', type=int, default=8, help='Читающих потоков в --contention')
+        parser.add_argument('--duration', type=float, default=5.0, help='Секунд на режим в --contention')
+        parser.add_argument('--requests', type=int, default=200, help='Запросов в нагрузочном тесте')
+        parser.add_argument('--concurrency', type=int, default=8, help='Одновременных запросов в нагрузочном тесте')
+
+    def handle(self, *args, **options):
+        scale = dict(benchmark.SCALES[options['scale']])
+        for key in ('bookings', 'users'):
+            if options[key] is not None:
+                scale[key] = options[key]
+
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text(encoding='utf-8'))
+            except (OSError, ValueError) as error:
+                raise CommandError(f'Не удалось прочитать {options["compare"]}: {error}')
+
+        with test_database(options['keepdb']):
+            if Booking.objects.count() < scale['bookings']:
+                self.stdout.write(f'Заполнение: {scale["bookings"]} бронирований, {scale["users"]} пользователей')
+                seeding.seed(scale['bookings'], scale['users'], seed=options['seed'])
+
+            if options['contention']:
+                result = benchmark.contention(options['writers'], options['readers'], options['duration'])
+            elif options['load']:
+                result = benchmark.load_test(options['requests'], options['concurrency'])
+            else:
+                try:
+                    result = benchmark.run(options['iterations'], options['warmup'], options['scenarios'])
+                except benchmark.BenchmarkError as error:
+                    raise CommandError(error)
+                result['meta'].update(scale, seed=options['seed'])
+
+        if options['contention']:
+            for mode, metrics in result['results'].items():
+                self.stdout.write(
+                    f'{mode:17} чтений/с {metrics["reads_per_second"]:8.1f}  p99 {metrics["read_p99_ms"] or 0:8.2f} мс  '
+                    f'записей/с {metrics["writes_per_second"]:7.1f}  p99 {metrics["write_p99_ms"] or 0:8.2f} мс  '
+                    f'ошибок {metrics["errors"]}'
+                )
+            self._save(result, options['output'])
+            return
+
+        if options['load']:
+            for mode in ('wsgi', 'asgi'):
+                metrics = result[mode]
+                self.stdout.write(
+                    f'{mode:5} {metrics["rps"]:8.1f} запр/с  p50 {metrics["p50_ms"]:8.2f} мс  '
+                    f'p99 {metrics["p99_ms"]:8.2f} мс  статусы {metrics["statuses"]}'
+                )
+            self._save(result, options['output'])
+            return
+
+        for name, metrics in result['results'].items():
+            self.stdout.write(
+                f'{name:24} p50 {metrics["p50_ms"]:8.2f} мс  p99 {metrics["p99_ms"]:8.2f} мс  '
+                f'запросов {metrics["queries"]:6.1f}  память {metrics["peak_memory_kb"]:8.1f} КБ  '
+                f'статусы {metrics["statuses"]}'
+                + (f'  входов/с на ядро {metrics["per_second"]}' if 'per_second' in metrics else '')
+            )
+        for name, reason in result['skipped'].items():
+            self.stdout.write(self.style.WARNING(f'{name:24} пропущен: {reason}'))
+
+        if baseline:
+            for row in benchmark.compare(baseline, result):
+                self.stdout.write(
+                    f'{row["scenario"]:24} p50 x{row["p50_ratio"]}  p99 x{row["p99_ratio"]}  '
+                    f'запросов {row["queries_delta"]:+}'
+                )
+
+        self._save(result, options['output'])
+
+    def _save(self, result, output):
+        if output:
+            Path(output).write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f'Результат сохранен в {output}'))
@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gallery_app import images
+
+
+class Command(BaseCommand):
+    help = 'Генерирует уменьшенные AVIF/WebP/JPEG варианты изображений галереи для srcset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Пересоздать варианты, даже если оригинал не изменился')
+
+    def handle(self, *args, **options):
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            raise CommandError('Для обработки изображений нужен Pillow: pip install Pillow')
+
+        source_dir = images.static_root() / images.SOURCE_DIR
+        output_dir = images.static_root() / images.OUTPUT_DIR
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        previous = images.load_manifest()
+        manifest = {}
+        original_bytes = variant_bytes = 0
+
+        for source in sorted(source_dir.iterdir()):
+            if source.suffix.lower() not in ('.png', '.jpg', '.jpeg', '.webp'):
+                continue
+            key = f'{images.SOURCE_DIR}/{source.name}'
+            entry, built = images.build_variants(
+                source, output_dir, previous.get(key), force=options['force']
+            )
+            manifest[key] = entry
+
+            original_bytes += source.stat().st_size
+            # Для сравнения берем вариант, который браузер выберет для ячейки сетки
+            variant_bytes += images.grid_variant(entry)['bytes']
+
+            if built:
+                self.stdout.write(f'  {key}: {len(entry["variants"])} форматов')
+
+        # Удаляем варианты, которых больше нет в манифесте
+        used = {v['url'].rsplit('/', 1)[-1]
+                for entry in manifest.values() for variants in entry['variants'].values() for v in variants}
+        for path in output_dir.iterdir():
+            if path.name != images.MANIFEST_NAME and path.name not in used:
+                path.unlink()
+
+        images.manifest_path().write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding='utf-8')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {len(manifest)} изображений, '
+            f'{original_bytes // 1024} КБ оригиналов -> {variant_bytes // 1024} КБ на сетку галереи'
+        ))
@@ -0,0 +1,59 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gallery_app import images
+from gallery_app.models import Photo, Tag
+
+
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.webp')
+
+
+def natural_key(path):
+    # image-2.png раньше image-10.png
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', path.name)]
+
+
+class Command(BaseCommand):
+    help = 'Добавляет изображения из static/images в галерею и сохраняет их метаданные'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tag', action='append', default=[],
+                            help='Тег для новых фотографий (можно указать несколько раз)')
+        parser.add_argument('--refresh', action='store_true',
+                            help='Перечитать метаданные уже добавленных фотографий')
+
+    def handle(self, *args, **options):
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            raise CommandError('Для чтения метаданных нужен Pillow: pip install Pillow')
+
+        source_dir = images.static_root() / images.SOURCE_DIR
+        sources = sorted((p for p in source_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES),
+                         key=natural_key)
+
+        existing = {photo.image: photo for photo in Photo.objects.all()}
+        tags = [Tag.objects.get_or_create(name=name)[0] for name in options['tag']]
+        next_order = max((photo.order for photo in existing.values()), default=0)
+
+        created = updated = 0
+        for source in sources:
+            path = f'{images.SOURCE_DIR}/{source.name}'
+            photo = existing.get(path)
+            if photo and not options['refresh']:
+                continue
+
+            metadata = images.photo_metadata(path)
+            if photo:
+                for field, value in metadata.items():
+                    setattr(photo, field, value)
+                photo.save()
+                updated += 1
+            else:
+                next_order += 1
+                photo = Photo.objects.create(image=path, order=next_order, **metadata)
+                photo.tags.add(*tags)
+                created += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Добавлено: {created}, обновлено: {updated}'))
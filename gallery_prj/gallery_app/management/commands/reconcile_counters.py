@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from gallery_app import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованный счетчик пользователей по таблице auth_user'
+
+    def handle(self, *args, **options):
+        previous, actual = counters.reconcile_user_count()
+        if previous is None:
+            self.stdout.write(self.style.SUCCESS(f'Счетчик создан: {actual}'))
+        elif previous != actual:
+            self.stdout.write(self.style.WARNING(f'Расхождение исправлено: {previous} -> {actual}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Счетчик актуален: {actual}'))
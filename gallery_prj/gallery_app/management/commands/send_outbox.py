@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gallery_app import notifications
+
+
+class Command(BaseCommand):
+    help = ('Отправляет письма из очереди OutboxEmail пачками через одно соединение; '
+            'рассчитан на один запущенный экземпляр')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=notifications.BATCH_SIZE,
+                            help='Писем за одно соединение с почтовым сервером')
+        parser.add_argument('--watch', action='store_true',
+                            help='Работать постоянно, проверяя очередь каждые --interval секунд')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Пауза между проверками пустой очереди в режиме --watch')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = notifications.drain_outbox(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f'  отправлено {sent}, отложено {failed}')
+            # Полная пачка: в очереди, вероятно, есть еще письма
+            if sent + failed == options['batch_size']:
+                continue
+            if not options['watch']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Готово: отправлено {total_sent}, отложено {total_failed}'))
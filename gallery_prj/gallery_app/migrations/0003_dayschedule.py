@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:21
+
+import datetime
+
+from django.db import migrations, models
+
+
+# Копии констант и функций gallery_app.availability и gallery_app.slots на
+# момент миграции: миграция не должна зависеть от текущего кода приложения
+BLOCKING_STATUSES = ('confirmed', 'pending')
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+ONE_DAY = datetime.timedelta(days=1)
+
+
+def interval_masks(booking_date, booking_time, duration, preparation=0):
+    start = (booking_time.hour * 60 + booking_time.minute) // SLOT_MINUTES
+    end = start + (duration + (preparation or 0)) * 60 // SLOT_MINUTES
+
+    masks = {}
+    day = booking_date
+    while end > 0:
+        if end > start:
+            start_bit, end_bit = max(start, 0), min(end, SLOTS_PER_DAY)
+            masks[day] = ((1 << (end_bit - start_bit)) - 1) << start_bit
+        start -= SLOTS_PER_DAY
+        end -= SLOTS_PER_DAY
+        day += ONE_DAY
+    return masks
+
+
+def build_masks(rows):
+    masks = {}
+    for booking_date, booking_time, duration, preparation in rows:
+        for day, mask in interval_masks(booking_date, booking_time, duration, preparation).items():
+            masks[day] = masks.get(day, 0) | mask
+    return masks
+
+
+def build_slot_index(apps, schema_editor):
+    Booking = apps.get_model('gallery_app', 'Booking')
+    DaySchedule = apps.get_model('gallery_app', 'DaySchedule')
+
+    rows = Booking.objects.filter(status__in=BLOCKING_STATUSES).values_list(
+        'booking_date', 'booking_time', 'duration', 'service__preparation_time'
+    )
+    DaySchedule.objects.bulk_create(
+        DaySchedule(date=day, slots=mask.to_bytes(12, 'big'))
+        for day, mask in build_masks(rows).items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery_app', '0002_service_can_be_booked_service_max_booking_hours_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DaySchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Дата')),
+                ('slots', models.BinaryField(default=b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00', verbose_name='Занятые слоты')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Занятость дня',
+                'verbose_name_plural': 'Занятость дней',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.RunPython(build_slot_index, migrations.RunPython.noop),
+    ]
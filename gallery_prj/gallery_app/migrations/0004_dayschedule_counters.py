@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:22
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+# Копии констант gallery_app.availability на момент миграции
+BLOCKING_STATUSES = ('confirmed', 'pending')
+HOURS_STATUSES = ('confirmed',)
+
+
+def fill_day_counters(apps, schema_editor):
+    Booking = apps.get_model('gallery_app', 'Booking')
+    DaySchedule = apps.get_model('gallery_app', 'DaySchedule')
+
+    rows = (
+        Booking.objects.filter(status__in=BLOCKING_STATUSES)
+        .order_by()
+        .values('booking_date')
+        .annotate(bookings=Count('id'), hours=Sum('duration', filter=Q(status__in=HOURS_STATUSES)))
+    )
+    for row in rows:
+        DaySchedule.objects.filter(date=row['booking_date']).update(
+            bookings=row['bookings'], hours=row['hours'] or 0
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery_app', '0003_dayschedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dayschedule',
+            name='bookings',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Количество съемок'),
+        ),
+        migrations.AddField(
+            model_name='dayschedule',
+            name='hours',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Подтвержденные часы'),
+        ),
+        migrations.RunPython(fill_day_counters, migrations.RunPython.noop),
+    ]
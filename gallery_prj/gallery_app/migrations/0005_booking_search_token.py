@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:26
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Копия токенизации gallery_app.search на момент миграции
+TOKEN_MAX_LENGTH = 100
+SPLIT_RE = re.compile(r'[\W_]+')
+
+
+def _words(value):
+    tokens = set()
+    for word in (value or '').lower().split():
+        tokens.add(word)
+        tokens.update(part for part in SPLIT_RE.split(word) if part)
+    return tokens
+
+
+def tokenize(booking):
+    tokens = _words(booking.client_name) | _words(booking.client_email)
+
+    digits = re.sub(r'\D', '', booking.client_phone or '')
+    if digits:
+        tokens.add(digits)
+        if len(digits) == 11 and digits[0] in '78':
+            tokens.add(digits[1:])
+
+    tokens.add(booking.id.hex)
+    return {token[:TOKEN_MAX_LENGTH] for token in tokens}
+
+
+def build_search_index(apps, schema_editor):
+    Booking = apps.get_model('gallery_app', 'Booking')
+    BookingSearchToken = apps.get_model('gallery_app', 'BookingSearchToken')
+
+    bookings = Booking.objects.only('id', 'client_name', 'client_phone', 'client_email')
+    BookingSearchToken.objects.bulk_create(
+        (BookingSearchToken(booking_id=booking.pk, token=token)
+         for booking in bookings.iterator()
+         for token in tokenize(booking)),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery_app', '0004_dayschedule_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=100, verbose_name='Токен')),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='gallery_app.booking', verbose_name='Бронирование')),
+            ],
+            options={
+                'verbose_name': 'Поисковый токен',
+                'verbose_name_plural': 'Поисковые токены',
+                'indexes': [models.Index(fields=['token', 'booking'], name='gallery_app_token_40a883_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
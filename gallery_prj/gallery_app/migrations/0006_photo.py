@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery_app', '0005_booking_search_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Название')),
+            ],
+            options={
+                'verbose_name': 'Тег',
+                'verbose_name_plural': 'Теги',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Photo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(blank=True, max_length=200, verbose_name='Название')),
+                ('image', models.CharField(max_length=255, unique=True, verbose_name='Файл (путь в static)')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина')),
+                ('height', models.PositiveIntegerField(verbose_name='Высота')),
+                ('file_size', models.PositiveIntegerField(verbose_name='Размер файла (байт)')),
+                ('dominant_color', models.CharField(blank=True, max_length=7, verbose_name='Основной цвет')),
+                ('captured_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата съемки')),
+                ('order', models.IntegerField(default=0, verbose_name='Порядок отображения')),
+                ('is_published', models.BooleanField(default=True, verbose_name='Опубликована')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата добавления')),
+                ('tags', models.ManyToManyField(blank=True, related_name='photos', to='gallery_app.tag', verbose_name='Теги')),
+            ],
+            options={
+                'verbose_name': 'Фотография',
+                'verbose_name_plural': 'Фотографии',
+                'ordering': ['order', 'id'],
+                'indexes': [models.Index(fields=['is_published', 'order', 'id'], name='gallery_app_is_publ_86526d_idx')],
+            },
+        ),
+    ]
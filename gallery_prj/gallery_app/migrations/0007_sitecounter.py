@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:33
+
+from django.db import migrations, models
+
+
+def init_user_counter(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    SiteCounter = apps.get_model('gallery_app', 'SiteCounter')
+    SiteCounter.objects.create(name='users', value=User.objects.count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery_app', '0006_photo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Счетчик')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Значение')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Счетчик',
+                'verbose_name_plural': 'Счетчики',
+            },
+        ),
+        migrations.RunPython(init_user_counter, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Копии gallery_app.availability.HOURS_STATUSES и gallery_app.slots.shooting_slots
+# на момент миграции
+HOURS_STATUSES = ('confirmed',)
+SLOT_MINUTES = 15
+
+
+def shooting_slots(booking_time, duration):
+    first = (booking_time.hour * 60 + booking_time.minute) // SLOT_MINUTES
+    return first, first + duration * 60 // SLOT_MINUTES - 1
+
+
+def fill_calendar_summary(apps, schema_editor):
+    Booking = apps.get_model('gallery_app', 'Booking')
+    DaySchedule = apps.get_model('gallery_app', 'DaySchedule')
+
+    summary = {}
+    rows = Booking.objects.filter(status__in=HOURS_STATUSES).values_list('booking_date', 'booking_time', 'duration')
+    for booking_date, booking_time, duration in rows:
+        first, last = shooting_slots(booking_time, duration)
+        confirmed, first_slot, last_slot = summary.get(booking_date, (0, first, last))
+        summary[booking_date] = (confirmed + 1, min(first_slot, first), max(last_slot, last))
+
+    for day, (confirmed, first_slot, last_slot) in summary.items():
+        DaySchedule.objects.filter(date=day).update(
+            confirmed=confirmed, first_slot=first_slot, last_slot=last_slot
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery_app', '0007_sitecounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='gallery_app_status_d55cd6_idx',
+        ),
+        migrations.AddField(
+            model_name='dayschedule',
+            name='confirmed',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Подтвержденные съемки'),
+        ),
+        migrations.AddField(
+            model_name='dayschedule',
+            name='first_slot',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Первый слот'),
+        ),
+        migrations.AddField(
+            model_name='dayschedule',
+            name='last_slot',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Последний слот'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'booking_date', 'booking_time'], name='gallery_app_status_966c6b_idx'),
+        ),
+        migrations.RunPython(fill_calendar_summary, migrations.RunPython.noop),
+    ]
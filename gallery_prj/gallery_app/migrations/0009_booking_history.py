@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery_app', '0008_calendar_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_status', models.CharField(choices=[('pending', 'Ожидает подтверждения'), ('confirmed', 'Подтверждено'), ('rejected', 'Отклонено'), ('completed', 'Выполнено'), ('cancelled', 'Отменено')], max_length=20, verbose_name='Прежний статус')),
+                ('new_status', models.CharField(choices=[('pending', 'Ожидает подтверждения'), ('confirmed', 'Подтверждено'), ('rejected', 'Отклонено'), ('completed', 'Выполнено'), ('cancelled', 'Отменено')], max_length=20, verbose_name='Новый статус')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата изменения')),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='gallery_app.booking', verbose_name='Бронирование')),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Кто изменил')),
+            ],
+            options={
+                'verbose_name': 'Изменение статуса',
+                'verbose_name_plural': 'История статусов',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['booking', 'created_at'], name='gallery_app_booking_57eb3a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('gallery_app', '0010_outbox_email'),
+    ]
+
+    # auth_user принадлежит contrib.auth, поэтому индекс создается SQL-выражением;
+    # синтаксис одинаков для SQLite и PostgreSQL
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS gallery_user_email_lower_idx ON auth_user (LOWER(email))',
+            'DROP INDEX IF EXISTS gallery_user_email_lower_idx',
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery_app', '0011_user_email_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingArchive',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('booking_date', models.DateField(verbose_name='Дата съемки')),
+                ('booking_time', models.TimeField(verbose_name='Время съемки')),
+                ('duration', models.IntegerField(verbose_name='Продолжительность (часы)')),
+                ('location', models.CharField(blank=True, max_length=500, verbose_name='Место съемки')),
+                ('client_name', models.CharField(max_length=200, verbose_name='Имя клиента')),
+                ('client_phone', models.CharField(max_length=20, verbose_name='Телефон')),
+                ('client_email', models.EmailField(max_length=254, verbose_name='Email')),
+                ('client_message', models.TextField(blank=True, verbose_name='Пожелания и комментарии')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает подтверждения'), ('confirmed', 'Подтверждено'), ('rejected', 'Отклонено'), ('completed', 'Выполнено'), ('cancelled', 'Отменено')], max_length=20, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(verbose_name='Дата обновления')),
+                ('admin_notes', models.TextField(blank=True, verbose_name='Заметки администратора')),
+                ('price_agreed', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Согласованная цена')),
+                ('history', models.JSONField(blank=True, default=list, verbose_name='История статусов')),
+                ('search_text', models.TextField(blank=True, editable=False, verbose_name='Поисковые токены')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата архивации')),
+                ('admin_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Подтвердил администратор')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gallery_app.service', verbose_name='Услуга')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Архивное бронирование',
+                'verbose_name_plural': 'Архив бронирований',
+                'ordering': ['-booking_date', '-booking_time'],
+                'indexes': [models.Index(fields=['booking_date'], name='gallery_app_booking_0d30d2_idx'), models.Index(fields=['user', 'status'], name='gallery_app_user_id_019890_idx')],
+            },
+        ),
+    ]
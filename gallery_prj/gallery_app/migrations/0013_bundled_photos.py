@@ -0,0 +1,81 @@
+import datetime
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+
+# Копия чтения метаданных из gallery_app.images и порядка файлов из команды
+# ingest_photos на момент миграции
+SOURCE_DIR = 'images'
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.webp')
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+
+
+def natural_key(path):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', path.name)]
+
+
+def _parse_exif_date(value):
+    try:
+        captured = datetime.datetime.strptime(str(value).strip(), '%Y:%m:%d %H:%M:%S')
+    except ValueError:
+        return None
+    return timezone.make_aware(captured)
+
+
+def extract_metadata(source):
+    from PIL import Image
+
+    with Image.open(source) as image:
+        width, height = image.size
+        exif = image.getexif()
+        captured = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+        red, green, blue = image.convert('RGB').resize((1, 1), Image.BOX).getpixel((0, 0))
+
+    return {
+        'width': width,
+        'height': height,
+        'file_size': source.stat().st_size,
+        'dominant_color': f'#{red:02x}{green:02x}{blue:02x}',
+        'captured_at': _parse_exif_date(captured) if captured else None,
+    }
+
+
+def ingest_bundled_photos(apps, schema_editor):
+    """Изображения из static/images, которые главная и галерея показывали до появления Photo"""
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        # Без Pillow метаданные не прочитать; фотографии добавит ingest_photos
+        return
+
+    Photo = apps.get_model('gallery_app', 'Photo')
+    source_dir = Path(settings.STATICFILES_DIRS[0]) / SOURCE_DIR
+    if not source_dir.is_dir():
+        return
+
+    sources = sorted((p for p in source_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES), key=natural_key)
+    existing = set(Photo.objects.values_list('image', flat=True))
+    next_order = max(Photo.objects.values_list('order', flat=True), default=0)
+    for source in sources:
+        path = f'{SOURCE_DIR}/{source.name}'
+        if path in existing:
+            continue
+        next_order += 1
+        Photo.objects.create(image=path, order=next_order, **extract_metadata(source))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery_app', '0012_booking_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(ingest_bundled_photos, migrations.RunPython.noop),
+    ]
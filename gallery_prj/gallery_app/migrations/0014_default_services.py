@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+# Услуги, которые раньше существовали только в db.sqlite3 из репозитория
+SERVICES = [
+    ('Съёмка в студии дневное время', 'Любой вид съёмок предусмотренный в студии', 1000, '1 час', 'PHOTO'),
+    ('Съёмка в студии любое время', 'Любой вид студийной съёмки', 1500, '1 час', 'PHOTO'),
+    ('Видеосъёмка меоприятия', '1121', 750, '1 час', 'VIDEO'),
+    ('Полноценный фотосет', '121', 5000, '5+ часов', 'OTHER'),
+    ('Простая обработка фотографий', '121', 500, '1-4 часа', 'EDITING'),
+    ('Сложная работа с фотографиями', '121', 2000, '5+ часов', 'EDITING'),
+    ('Съёмка и монтаж фильмов по вашему сценарию', '1213', 10000, '1-3 дня', 'VIDEO'),
+    ('Фотосъёмка на открытом воздухе', '1231', 1500, '1 час', 'PHOTO'),
+]
+
+
+def create_default_services(apps, schema_editor):
+    Service = apps.get_model('gallery_app', 'Service')
+    # В базах, где услуги уже заведены, ничего не меняем
+    if Service.objects.exists():
+        return
+    Service.objects.bulk_create(
+        Service(name=name, description=description, price=price, duration=duration, service_type=service_type,
+                is_active=True, order=0, can_be_booked=True, max_booking_hours=8, min_booking_hours=1,
+                preparation_time=1)
+        for name, description, price, duration, service_type in SERVICES
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery_app', '0013_bundled_photos'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_default_services, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, NullIf
 from django.contrib.auth.models import User
+from django.utils import timezone
 import uuid
 
 class Service(models.Model):
@@ -33,6 +36,22 @@ class Service(models.Model):
         return f"{self.name} - {self.price} руб."
 
 
+class BookingQuerySet(models.QuerySet):
+    # Поля, которые показываются в списках бронирований и в админке
+    LISTING_FIELDS = (
+        'id', 'status', 'booking_date', 'booking_time', 'duration', 'location',
+        'client_name', 'client_phone', 'client_email', 'client_message',
+        'price_agreed', 'created_at',
+        'service__name', 'service__price', 'service__service_type',
+        'user__username', 'user__email',
+        'admin_user__username',
+    )
+
+    def for_listing(self):
+        """Связанные объекты одним JOIN и только отображаемые колонки"""
+        return self.select_related('service', 'user', 'admin_user').only(*self.LISTING_FIELDS)
+
+
 class Booking(models.Model):
     """Модель бронирования услуги"""
 
@@ -73,12 +92,18 @@ class Booking(models.Model):
     admin_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
                                    related_name='bookings_managed', verbose_name='Подтвердил администратор')
 
+    objects = BookingQuerySet.as_manager()
+
+    # Архивные бронирования - BookingArchive
+    is_archived = False
+
     class Meta:
         verbose_name = 'Бронирование'
         verbose_name_plural = 'Бронирования'
         ordering = ['-booking_date', '-booking_time']
         indexes = [
-            models.Index(fields=['status']),
+            # Префикс status заменяет отдельный индекс по статусу
+            models.Index(fields=['status', 'booking_date', 'booking_time']),
             models.Index(fields=['booking_date']),
             models.Index(fields=['user', 'status']),
         ]
@@ -86,6 +111,34 @@ class Booking(models.Model):
     def __str__(self):
         return f"{self.client_name} - {self.service.name} ({self.get_status_display()})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Запоминаем загруженные значения, чтобы сигналы видели прежние дату и статус
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Сигналы post_save уже сравнили с прежними значениями; следующее
+        # сохранение того же объекта должно сравнивать с сохраненными сейчас
+        update_fields = kwargs.get('update_fields')
+        saved = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__ and (update_fields is None or field.name in update_fields)
+        }
+        self._loaded_values = {**getattr(self, '_loaded_values', {}), **saved}
+
+    @staticmethod
+    def total_price_expression():
+        """SQL-аналог get_total_price: согласованная цена или цена услуги за час"""
+        return Coalesce(
+            NullIf('price_agreed', Value(0)),
+            F('service__price') * F('duration'),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )
+
     def get_total_price(self):
 
         if self.price_agreed:
@@ -96,7 +149,7 @@ class Booking(models.Model):
 
         from django.utils import timezone
         import datetime
-        booking_datetime = datetime.datetime.combine(self.booking_date, self.booking_time)
+        booking_datetime = timezone.make_aware(datetime.datetime.combine(self.booking_date, self.booking_time))
         return booking_datetime > timezone.now()
 
     def get_days_until(self):
@@ -105,4 +158,232 @@ class Booking(models.Model):
         import datetime
         booking_datetime = datetime.datetime.combine(self.booking_date, self.booking_time)
         today = timezone.now().date()
-        return (self.booking_date - today).days
\ No newline at end of file
+        return (self.booking_date - today).days
+
+class BookingArchive(models.Model):
+    """Завершенное бронирование, перенесенное из Booking командой archive_bookings.
+
+    Поля совпадают с Booking, поэтому списки, фильтры и выгрузки работают с
+    обеими таблицами одинаково. Журнал статусов хранится в самой записи.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_bookings',
+                             verbose_name='Пользователь')
+    service = models.ForeignKey('Service', on_delete=models.CASCADE, related_name='+', verbose_name='Услуга')
+
+    booking_date = models.DateField(verbose_name='Дата съемки')
+    booking_time = models.TimeField(verbose_name='Время съемки')
+    duration = models.IntegerField(verbose_name='Продолжительность (часы)')
+    location = models.CharField(max_length=500, verbose_name='Место съемки', blank=True)
+
+    client_name = models.CharField(max_length=200, verbose_name='Имя клиента')
+    client_phone = models.CharField(max_length=20, verbose_name='Телефон')
+    client_email = models.EmailField(verbose_name='Email')
+    client_message = models.TextField(verbose_name='Пожелания и комментарии', blank=True)
+
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES, verbose_name='Статус')
+    created_at = models.DateTimeField(verbose_name='Дата создания')
+    updated_at = models.DateTimeField(verbose_name='Дата обновления')
+
+    admin_notes = models.TextField(verbose_name='Заметки администратора', blank=True)
+    price_agreed = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Согласованная цена', null=True,
+                                       blank=True)
+    admin_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='+', verbose_name='Подтвердил администратор')
+
+    # Записи BookingHistory: [{old_status, new_status, changed_by, created_at}, ...]
+    history = models.JSONField(default=list, blank=True, verbose_name='История статусов')
+    # Поисковые токены через пробел с ведущим пробелом: ' токен1 токен2'
+    search_text = models.TextField(blank=True, editable=False, verbose_name='Поисковые токены')
+    archived_at = models.DateTimeField(default=timezone.now, verbose_name='Дата архивации')
+
+    objects = BookingQuerySet.as_manager()
+
+    is_archived = True
+
+    class Meta:
+        verbose_name = 'Архивное бронирование'
+        verbose_name_plural = 'Архив бронирований'
+        ordering = ['-booking_date', '-booking_time']
+        indexes = [
+            models.Index(fields=['booking_date']),
+            models.Index(fields=['user', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.client_name} - {self.service.name} ({self.get_status_display()})"
+
+    total_price_expression = staticmethod(Booking.total_price_expression)
+    get_total_price = Booking.get_total_price
+
+    def is_upcoming(self):
+        # В архив попадают только прошедшие съемки
+        return False
+
+
+class BookingHistory(models.Model):
+    """Журнал смены статусов бронирования"""
+
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='history',
+                                verbose_name='Бронирование')
+    old_status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES, verbose_name='Прежний статус')
+    new_status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES, verbose_name='Новый статус')
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='+', verbose_name='Кто изменил')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата изменения')
+
+    class Meta:
+        verbose_name = 'Изменение статуса'
+        verbose_name_plural = 'История статусов'
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['booking', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_old_status_display()} → {self.get_new_status_display()}"
+
+
+class DaySchedule(models.Model):
+    """Индекс занятости дня: битовая маска 15-минутных слотов"""
+
+    date = models.DateField(unique=True, verbose_name='Дата')
+    slots = models.BinaryField(default=bytes(12), verbose_name='Занятые слоты')
+    bookings = models.PositiveSmallIntegerField(default=0, verbose_name='Количество съемок')
+    hours = models.PositiveSmallIntegerField(default=0, verbose_name='Подтвержденные часы')
+    # Сводка подтвержденных съемок дня для календаря
+    confirmed = models.PositiveSmallIntegerField(default=0, verbose_name='Подтвержденные съемки')
+    first_slot = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Первый слот')
+    last_slot = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Последний слот')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
+
+    class Meta:
+        verbose_name = 'Занятость дня'
+        verbose_name_plural = 'Занятость дней'
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date}: {bin(self.mask).count('1')} слотов занято"
+
+    @property
+    def mask(self):
+        return int.from_bytes(bytes(self.slots), 'big')
+
+    @mask.setter
+    def mask(self, value):
+        self.slots = value.to_bytes(12, 'big')
+
+
+class BookingSearchToken(models.Model):
+    """Поисковый индекс бронирований: нормализованные слова имени, телефона и email"""
+
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='search_tokens',
+                                verbose_name='Бронирование')
+    token = models.CharField(max_length=100, verbose_name='Токен')
+
+    class Meta:
+        verbose_name = 'Поисковый токен'
+        verbose_name_plural = 'Поисковые токены'
+        indexes = [
+            models.Index(fields=['token', 'booking']),
+        ]
+
+    def __str__(self):
+        return self.token
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=50, unique=True, verbose_name='Название')
+
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class PhotoQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(is_published=True)
+
+
+class Photo(models.Model):
+    """Фотография галереи; метаданные извлекаются один раз: командой ingest_photos или в админке"""
+
+    title = models.CharField(max_length=200, blank=True, verbose_name='Название')
+    image = models.CharField(max_length=255, unique=True, verbose_name='Файл (путь в static)')
+    width = models.PositiveIntegerField(verbose_name='Ширина')
+    height = models.PositiveIntegerField(verbose_name='Высота')
+    file_size = models.PositiveIntegerField(verbose_name='Размер файла (байт)')
+    dominant_color = models.CharField(max_length=7, blank=True, verbose_name='Основной цвет')
+    captured_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата съемки')
+    order = models.IntegerField(default=0, verbose_name='Порядок отображения')
+    tags = models.ManyToManyField(Tag, blank=True, related_name='photos', verbose_name='Теги')
+    is_published = models.BooleanField(default=True, verbose_name='Опубликована')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата добавления')
+
+    objects = PhotoQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Фотография'
+        verbose_name_plural = 'Фотографии'
+        ordering = ['order', 'id']
+        indexes = [
+            models.Index(fields=['is_published', 'order', 'id']),
+        ]
+
+    def __str__(self):
+        return self.title or self.image
+
+
+class SiteCounter(models.Model):
+    """Денормализованные счетчики, чтобы не считать COUNT(*) на каждый запрос"""
+
+    USERS = 'users'
+
+    name = models.CharField(max_length=50, unique=True, verbose_name='Счетчик')
+    value = models.BigIntegerField(default=0, verbose_name='Значение')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
+
+    class Meta:
+        verbose_name = 'Счетчик'
+        verbose_name_plural = 'Счетчики'
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class OutboxEmail(models.Model):
+    """Письмо в очереди отправки; создается в одной транзакции с изменением бронирования"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает отправки'),
+        ('sent', 'Отправлено'),
+        ('failed', 'Не удалось отправить'),
+    ]
+
+    booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='emails', verbose_name='Бронирование')
+    to = models.EmailField(verbose_name='Получатель')
+    subject = models.CharField(max_length=200, verbose_name='Тема')
+    body = models.TextField(verbose_name='Текст')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name='Статус')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Попытки')
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name='Следующая попытка')
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата отправки')
+
+    class Meta:
+        verbose_name = 'Письмо'
+        verbose_name_plural = 'Очередь писем'
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.to}: {self.subject}"
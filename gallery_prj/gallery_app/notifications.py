@@ -0,0 +1,97 @@
+"""Письма клиентам о смене статуса бронирования.
+
+Письма не отправляются в запросе: они записываются в OutboxEmail в той же
+транзакции, что и изменение бронирования, и уходят командой send_outbox.
+Команда отправляет пачку через одно соединение с почтовым сервером, а при
+ошибке откладывает письмо с экспоненциально растущей паузой.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+STATUS_SUBJECTS = {
+    'confirmed': 'Бронирование подтверждено',
+    'rejected': 'Бронирование отклонено',
+    'completed': 'Съемка завершена',
+    'cancelled': 'Бронирование отменено',
+}
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 60 * 60
+
+
+def status_email(booking):
+    """Неотправленное письмо о текущем статусе или None"""
+    subject = STATUS_SUBJECTS.get(booking.status)
+    if subject is None or not booking.client_email:
+        return None
+    body = (
+        f"Здравствуйте, {booking.client_name}!\n\n"
+        f"{subject}: {booking.service.name}, "
+        f"{booking.booking_date:%d.%m.%Y} в {booking.booking_time:%H:%M}.\n"
+    )
+    return OutboxEmail(booking_id=booking.pk, to=booking.client_email, subject=subject, body=body)
+
+
+def enqueue_status_notifications(bookings):
+    """Постановка писем в очередь одним INSERT; вызывать внутри транзакции изменения"""
+    emails = [email for email in map(status_email, bookings) if email]
+    OutboxEmail.objects.bulk_create(emails)
+    return len(emails)
+
+
+def retry_delay(attempts):
+    return datetime.timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def _defer(email, error, now):
+    """Неудачная попытка: письмо откладывается или помечается неотправляемым"""
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = 'failed'
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+    return email
+
+
+def drain_outbox(batch_size=BATCH_SIZE, connection=None):
+    """Отправка одной пачки писем, срок которых наступил; возвращает (отправлено, ошибок)"""
+    now = timezone.now()
+    batch = list(OutboxEmail.objects.filter(status='pending', next_attempt_at__lte=now)[:batch_size])
+    if not batch:
+        return 0, 0
+
+    connection = connection or get_connection()
+    sent, failed = [], []
+    try:
+        connection.open()
+    except Exception as error:
+        # Почтовый сервер недоступен: откладывается вся пачка
+        failed = [_defer(email, error, now) for email in batch]
+    else:
+        try:
+            for email in batch:
+                message = EmailMessage(email.subject, email.body, settings.DEFAULT_FROM_EMAIL, [email.to],
+                                       connection=connection)
+                try:
+                    message.send()
+                except Exception as error:
+                    failed.append(_defer(email, error, now))
+                else:
+                    sent.append(email.pk)
+        finally:
+            connection.close()
+
+    if sent:
+        OutboxEmail.objects.filter(pk__in=sent).update(status='sent', sent_at=now, last_error='')
+    if failed:
+        OutboxEmail.objects.bulk_update(failed, ['status', 'attempts', 'next_attempt_at', 'last_error'])
+    return len(sent), len(failed)
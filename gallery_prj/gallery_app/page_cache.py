@@ -0,0 +1,111 @@
+"""Кеш публичных страниц с точной инвалидацией по группам.
+
+Каждая кешируемая страница относится к группе (например, 'prices'). Ключ
+содержит номер версии группы, язык и адрес запроса. Сигналы изменения моделей
+увеличивают версию группы, и все ее страницы сразу становятся неактуальными
+без ожидания TTL. Кешируются только страницы для анонимных пользователей:
+шапка сайта для авторизованных содержит имя пользователя.
+"""
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .routers import use_primary
+
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 60 * 24)
+
+GALLERY = 'gallery'
+PRICES = 'prices'
+
+
+def _version_key(group):
+    return f'page_version:{group}'
+
+
+def get_version(group):
+    version = cache.get(_version_key(group))
+    if version is None:
+        version = 1
+        cache.add(_version_key(group), version, None)
+    return version
+
+
+def invalidate(group):
+    """Все страницы группы становятся неактуальными"""
+    try:
+        cache.incr(_version_key(group))
+    except ValueError:
+        cache.add(_version_key(group), 2, None)
+
+
+def _page_key(request, group, version):
+    language = getattr(request, 'LANGUAGE_CODE', settings.LANGUAGE_CODE)
+    return f'page:{group}:{version}:{language}:{request.get_full_path()}'
+
+
+def _is_cacheable(request):
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return False
+    # Страница с непоказанными сообщениями уникальна для этого запроса
+    return not len(get_messages(request))
+
+
+def _cached_response(cached):
+    content, content_type = cached
+    return HttpResponse(content, content_type=content_type)
+
+
+def _should_store(response):
+    return response.status_code == 200 and not response.streaming
+
+
+def _finish(response, status):
+    response['X-Page-Cache'] = status
+    patch_vary_headers(response, ('Cookie', 'Accept-Language'))
+    return response
+
+
+def cached_page(group):
+    """Кеширование ответа view для анонимных пользователей в группе group"""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                # Сессия и пользователь читаются из БД, в async-контексте это делается в потоке
+                if not await sync_to_async(_is_cacheable)(request):
+                    return await view(request, *args, **kwargs)
+
+                key = _page_key(request, group, await sync_to_async(get_version)(group))
+                cached = await cache.aget(key)
+                if cached is not None:
+                    return _finish(_cached_response(cached), 'hit')
+                # В общий кеш не должна попасть страница с отстающей реплики
+                with use_primary():
+                    response = await view(request, *args, **kwargs)
+                if _should_store(response):
+                    await cache.aset(key, (response.content, response['Content-Type']), PAGE_CACHE_TIMEOUT)
+                return _finish(response, 'miss')
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _is_cacheable(request):
+                return view(request, *args, **kwargs)
+
+            key = _page_key(request, group, get_version(group))
+            cached = cache.get(key)
+            if cached is not None:
+                return _finish(_cached_response(cached), 'hit')
+            with use_primary():
+                response = view(request, *args, **kwargs)
+            if _should_store(response):
+                cache.set(key, (response.content, response['Content-Type']), PAGE_CACHE_TIMEOUT)
+            return _finish(response, 'miss')
+        return wrapper
+    return decorator
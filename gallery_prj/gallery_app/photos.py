@@ -0,0 +1,87 @@
+"""Keyset-пагинация фотографий галереи.
+
+Вместо OFFSET следующая страница ищется по курсору (order, id) последней
+показанной фотографии, поэтому запрос идет по индексу
+(is_published, order, id) и одинаково быстр на любой глубине прокрутки.
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.templatetags.static import static
+
+from . import images
+from .models import Photo
+
+
+PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+LISTING_FIELDS = ('id', 'title', 'image', 'width', 'height', 'dominant_color', 'order')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(photo):
+    return base64.urlsafe_b64encode(f'{photo.order}:{photo.id}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        order, photo_id = raw.split(':')
+        return int(order), int(photo_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+
+
+def _page_queryset(after, limit):
+    photos = Photo.objects.published().only(*LISTING_FIELDS).order_by('order', 'id')
+    if after:
+        order, photo_id = decode_cursor(after)
+        photos = photos.filter(Q(order__gt=order) | Q(order=order, id__gt=photo_id))
+    # Одна лишняя строка показывает, есть ли следующая страница, без COUNT
+    return photos[:limit + 1]
+
+
+def _split_page(page, limit):
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+def get_photo_page(after=None, limit=PAGE_SIZE):
+    """Фотографии после курсора и курсор следующей страницы (None на последней)"""
+    return _split_page(list(_page_queryset(after, limit)), limit)
+
+
+async def aget_photo_page(after=None, limit=PAGE_SIZE):
+    """Асинхронный вариант get_photo_page"""
+    return _split_page([photo async for photo in _page_queryset(after, limit)], limit)
+
+
+def serialize_photo(photo, manifest):
+    entry = manifest.get(photo.image)
+    data = {
+        'id': photo.id,
+        'title': photo.title,
+        'url': f'/gallery/photo/{photo.id}/',
+        'width': photo.width,
+        'height': photo.height,
+        'dominant_color': photo.dominant_color,
+        'src': static(photo.image),
+        'thumbnail': None,
+        'srcset': {},
+    }
+    if entry:
+        thumbnail = images.grid_variant(entry)
+        data['thumbnail'] = {
+            'url': static(thumbnail['url']),
+            'width': thumbnail['width'],
+            'height': thumbnail['height'],
+        }
+        data['srcset'] = {
+            mime: images.srcset(entry['variants'][ext])
+            for ext, _, mime, _ in images.FORMATS if ext in entry['variants']
+        }
+    return data
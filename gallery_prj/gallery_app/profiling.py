@@ -0,0 +1,172 @@
+"""Замеры производительности запросов.
+
+PerformanceMiddleware измеряет время ответа каждого запроса, а для доли
+запросов (PERF_SAMPLE_RATE) дополнительно считает запросы к БД и их время
+через connection.execute_wrapper, время рендеринга шаблонов и размер ответа.
+Метрики пишутся в лог gallery_app.performance одной JSON-строкой с именем URL
+и, если включено PERF_SERVER_TIMING, в заголовок Server-Timing. Запросы
+дольше PERF_SLOW_REQUEST_MS логируются с уровнем WARNING всегда.
+
+Участки кода внутри view замеряются через `with track('имя'):`. Middleware
+поддерживает и синхронный, и асинхронный стек; метрики текущего запроса
+хранятся в ContextVar, который asgiref передает в sync_to_async.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template as BackendTemplate
+
+
+logger = logging.getLogger('gallery_app.performance')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.spans = {}
+
+    def add_span(self, name, duration):
+        self.spans[name] = self.spans.get(name, 0.0) + duration
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+@contextmanager
+def track(name):
+    """Замер участка кода; вне выбранного запроса ничего не делает"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_span(name, time.perf_counter() - start)
+
+
+_original_render = BackendTemplate.render
+
+
+def _timed_render(self, context=None, request=None):
+    metrics = _current.get()
+    if metrics is None:
+        return _original_render(self, context, request)
+    start = time.perf_counter()
+    try:
+        return _original_render(self, context, request)
+    finally:
+        metrics.template_time += time.perf_counter() - start
+
+
+def install_template_timing():
+    """Замер рендеринга шаблонов; вызывается один раз из GalleryAppConfig.ready()"""
+    # Верхний уровень рендеринга шаблона; вложенные include входят в его время
+    BackendTemplate.render = _timed_render
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def server_timing(data):
+    parts = [f"total;dur={data['total_ms']}"]
+    if 'db_ms' in data:
+        parts.append(f"db;dur={data['db_ms']};desc=\"{data['queries']} queries\"")
+        parts.append(f"template;dur={data['template_ms']}")
+        parts += [f'{name};dur={duration}' for name, duration in data['spans'].items()]
+    return ', '.join(parts)
+
+
+class PerformanceMiddleware:
+    # Работает и под WSGI, и под ASGI: async-view не переводятся в поток ради замера
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERF_SAMPLE_RATE', 1.0)
+        self.slow_ms = getattr(settings, 'PERF_SLOW_REQUEST_MS', 500)
+        self.server_timing = getattr(settings, 'PERF_SERVER_TIMING', settings.DEBUG)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics() if random.random() < self.sample_rate else None
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with self._wrap_queries(metrics):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._report(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics() if random.random() < self.sample_rate else None
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        # Соединения с БД привязаны к потоку: async-view выполняют запросы в потоке
+        # sync_to_async, поэтому обертка ставится там же
+        stack = await sync_to_async(self._wrap_queries)(metrics) if metrics is not None else None
+        try:
+            response = await self.get_response(request)
+        finally:
+            if stack is not None:
+                await sync_to_async(stack.close)()
+            _current.reset(token)
+        return self._report(request, response, metrics, time.perf_counter() - start)
+
+    def _wrap_queries(self, metrics):
+        stack = ExitStack()
+        if metrics is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics.execute_wrapper))
+        return stack
+
+    def _report(self, request, response, metrics, total):
+        slow = _ms(total) >= self.slow_ms
+        if metrics is None and not slow:
+            return response
+
+        match = request.resolver_match
+        data = {
+            'url_name': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': _ms(total),
+            'bytes': None if response.streaming else len(response.content),
+        }
+        if metrics is not None:
+            data.update({
+                'queries': metrics.queries,
+                'db_ms': _ms(metrics.db_time),
+                'template_ms': _ms(metrics.template_time),
+                'spans': {name: _ms(duration) for name, duration in metrics.spans.items()},
+            })
+
+        logger.log(logging.WARNING if slow else logging.INFO, json.dumps(data, ensure_ascii=False),
+                   extra={'performance': data})
+        if self.server_timing:
+            response['Server-Timing'] = server_timing(data)
+        return response
@@ -0,0 +1,65 @@
+"""Атомарное создание бронирований.
+
+Проверка формы и сохранение разделены во времени, поэтому два клиента могут
+пройти валидацию на один и тот же последний слот. Здесь место резервируется
+условным UPDATE строки DaySchedule (compare-and-swap по маске слотов и счетчику
+съемок) в одной транзакции с сохранением бронирования. Конкурируют только
+запросы на один и тот же день.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+
+from . import slots
+from .availability import DayOccupancy, has_capacity
+from .models import DaySchedule
+
+
+class _Conflict(Exception):
+    """Строка дня изменилась между чтением и обновлением"""
+
+
+def _claim(booking, wanted):
+    current = {
+        day: (bytes(day_slots), bookings, hours)
+        for day, day_slots, bookings, hours in DaySchedule.objects.filter(date__in=wanted)
+        .values_list('date', 'slots', 'bookings', 'hours')
+    }
+
+    _, bookings, hours = current[booking.booking_date]
+    if not has_capacity(DayOccupancy(bookings, hours)):
+        raise ValidationError('На эту дату больше нет свободных мест')
+
+    for day, mask in sorted(wanted.items()):
+        old_slots, old_bookings, _ = current[day]
+        old_mask = int.from_bytes(old_slots, 'big')
+        if old_mask & mask:
+            raise ValidationError('Это время уже занято')
+
+        updates = {'slots': (old_mask | mask).to_bytes(12, 'big')}
+        if day == booking.booking_date:
+            updates['bookings'] = F('bookings') + 1
+
+        if not DaySchedule.objects.filter(date=day, slots=old_slots, bookings=old_bookings).update(**updates):
+            raise _Conflict
+
+
+def reserve(booking, attempts=10):
+    """Сохранение нового бронирования с проверкой вместимости дня и слотов"""
+    wanted = slots.interval_masks(
+        booking.booking_date, booking.booking_time, booking.duration, booking.service.preparation_time
+    )
+
+    with transaction.atomic():
+        DaySchedule.objects.bulk_create([DaySchedule(date=day) for day in wanted], ignore_conflicts=True)
+
+        for _ in range(attempts):
+            try:
+                with transaction.atomic():
+                    _claim(booking, wanted)
+                    booking.save()
+                return booking
+            except _Conflict:
+                continue
+
+    raise ValidationError('Не удалось забронировать время, попробуйте еще раз')
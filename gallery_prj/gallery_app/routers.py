@@ -0,0 +1,136 @@
+"""Чтение с реплик для view, которые только читают.
+
+Чтения моделей gallery_app внутри view с декоратором @read_replica уходят на
+одну из реплик DATABASE_REPLICAS, все остальное - на основную базу. Сессии и
+пользователи всегда читаются с основной: только что созданная сессия может
+еще не дойти до реплики.
+
+Read-your-writes: если запрос что-то записал, ReplicaPinMiddleware ставит
+cookie, и следующие REPLICA_PIN_SECONDS секунд все чтения этого клиента идут
+на основную базу, пока реплика догоняет. Внутри запроса после первой записи
+чтения тоже идут на основную.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+PIN_COOKIE = 'primary_pin'
+REPLICA_APPS = {'gallery_app'}
+
+
+class RoutingState:
+    """Состояние маршрутизации текущего запроса"""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        # view разрешил реплику / блок use_primary ее запретил / запрос уже писал
+        self.replica = False
+        self.primary = False
+        self.wrote = False
+
+    def use_replica(self):
+        return self.replica and not (self.primary or self.pinned or self.wrote)
+
+
+_state = ContextVar('replica_routing', default=None)
+
+
+@contextmanager
+def _override(name, value):
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    previous = getattr(state, name)
+    setattr(state, name, value)
+    try:
+        yield
+    finally:
+        setattr(state, name, previous)
+
+
+def read_replica(view):
+    """Чтения внутри view можно отдавать реплике"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            with _override('replica', True):
+                return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with _override('replica', True):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def use_primary():
+    """Чтения внутри блока идут на основную базу, даже во view с @read_replica"""
+    return _override('primary', True)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replica():
+            return None
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or model._meta.app_label not in REPLICA_APPS:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaPinMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(response, state)
+
+    async def __acall__(self, request):
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(response, state)
+
+    def _pin(self, response, state):
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
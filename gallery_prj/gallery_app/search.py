@@ -0,0 +1,97 @@
+"""Поиск бронирований по индексу токенов.
+
+Вместо icontains по четырем колонкам с JOIN на услугу каждая бронь хранит
+набор нормализованных токенов (слова имени, части email, цифры телефона,
+hex-идентификатор). Поиск по префиксу превращается в диапазонный запрос
+token >= 'abc' AND token < 'abc\\uffff', который обслуживается индексом
+на любой СУБД.
+"""
+import re
+
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+from .models import BookingSearchToken, Service
+
+
+TOKEN_MAX_LENGTH = 100
+PHONE_QUERY_RE = re.compile(r'^[\d\s()+\-.]+$')
+SPLIT_RE = re.compile(r'[\W_]+')
+
+
+def normalize_phone(value):
+    return re.sub(r'\D', '', value or '')
+
+
+def _words(value):
+    tokens = set()
+    for word in (value or '').lower().split():
+        tokens.add(word)
+        tokens.update(part for part in SPLIT_RE.split(word) if part)
+    return tokens
+
+
+def tokenize(booking):
+    """Набор токенов для бронирования"""
+    tokens = _words(booking.client_name) | _words(booking.client_email)
+
+    digits = normalize_phone(booking.client_phone)
+    if digits:
+        tokens.add(digits)
+        # Номер без кода страны: 7/8 (999) ... -> 999...
+        if len(digits) == 11 and digits[0] in '78':
+            tokens.add(digits[1:])
+
+    tokens.add(booking.id.hex)
+    return {token[:TOKEN_MAX_LENGTH] for token in tokens}
+
+
+def index_booking(booking):
+    BookingSearchToken.objects.filter(booking=booking).delete()
+    BookingSearchToken.objects.bulk_create(
+        BookingSearchToken(booking=booking, token=token) for token in tokenize(booking)
+    )
+
+
+def parse_query(query):
+    """Разбор строки поиска на термы; номер телефона схлопывается в цифры"""
+    query = query.strip()
+    if PHONE_QUERY_RE.match(query) and normalize_phone(query):
+        return [normalize_phone(query)]
+    return [term.replace('-', '') if _is_uuid_fragment(term) else term
+            for term in query.lower().split()]
+
+
+def _is_uuid_fragment(term):
+    return len(term) >= 8 and re.fullmatch(r'[0-9a-f\-]+', term) is not None and '-' in term
+
+
+def _text_filter(term, archived):
+    if archived:
+        # Архив просматривается только по запросу истории, поэтому токены в нем
+        # хранятся строкой без отдельного индекса
+        return Q(search_text__contains=' ' + term)
+    return Q(pk__in=BookingSearchToken.objects.filter(
+        token__gte=term, token__lt=term + '\uffff'
+    ).values('booking_id'))
+
+
+def _term_filter(term, archived=False):
+    # Услуг и пользователей немного, их ищем напрямую без индекса токенов.
+    # Названия услуг сравниваем в Python: LIKE в SQLite не различает регистр только для ASCII
+    matching_services = [pk for pk, name in Service.objects.values_list('pk', 'name')
+                         if term in name.lower()]
+    matching_users = User.objects.filter(
+        Q(username__istartswith=term) | Q(email__istartswith=term)
+    ).values('pk')
+
+    return (_text_filter(term, archived)
+            | Q(service__in=matching_services)
+            | Q(user__in=matching_users))
+
+
+def search_bookings(queryset, query):
+    """Бронирования, у которых каждый терм запроса совпадает по префиксу"""
+    for term in parse_query(query):
+        queryset = queryset.filter(_term_filter(term[:TOKEN_MAX_LENGTH], queryset.model.is_archived))
+    return queryset
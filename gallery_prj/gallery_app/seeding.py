@@ -0,0 +1,226 @@
+"""Генерация синтетических данных для нагрузочного тестирования.
+
+Строки генерируются потоком и пишутся пачками через bulk_create в крупных
+транзакциях, минуя save() и сигналы, поэтому производные данные (индекс дней,
+поисковые токены, счетчик пользователей, кеши) пересчитываются в конце явно.
+Распределения приближены к реальным: доля статусов зависит от того, прошла ли
+съемка, субботы и пиковые дни загружены сильнее, длительность лежит в
+пределах услуги. Занимающие день бронирования не превышают вместимость студии
+и не пересекаются по времени: заявки сверх нее считаются отклоненными.
+Результат детерминирован для заданного seed.
+"""
+import datetime
+import itertools
+import random
+import uuid
+from collections import defaultdict
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import counters, page_cache, slots, stats
+from .availability import (BLOCKING_STATUSES, HOURS_STATUSES, LAST_START_TIME, MAX_BOOKINGS_PER_DAY,
+                           MAX_HOURS_PER_DAY, OPENING_TIME)
+from .models import Booking, BookingSearchToken, Service
+from .search import tokenize
+
+
+BATCH_SIZE = 2000
+# Строк в одной транзакции: меньше фиксаций, но журнал не разрастается
+TRANSACTION_ROWS = 50_000
+# Одна пачка дат для пересчета индекса дней
+REBUILD_CHUNK = 200
+
+USERNAME_PREFIX = 'seed'
+PASSWORD = 'seed-password'
+
+# Название, тип, цена за час, мин. и макс. часов, подготовка, доля заказов
+SERVICES = (
+    ('Портретная съемка', 'PHOTO', 3000, 1, 3, 1, 40),
+    ('Семейная фотосессия', 'PHOTO', 4500, 1, 4, 1, 25),
+    ('Свадебная съемка', 'PHOTO', 8000, 4, 10, 2, 10),
+    ('Видеосъемка мероприятия', 'VIDEO', 7000, 2, 8, 2, 10),
+    ('Предметная съемка', 'PHOTO', 2500, 1, 2, 0, 15),
+)
+
+# Прошедшие съемки в основном выполнены, будущие ждут подтверждения или подтверждены
+PAST_STATUSES = (('completed', 75), ('cancelled', 12), ('rejected', 5), ('confirmed', 8))
+FUTURE_STATUSES = (('confirmed', 50), ('pending', 40), ('cancelled', 7), ('rejected', 3))
+
+DAYS_BACK = 365
+DAYS_AHEAD = 90
+# Суббота загружена сильнее будней, воскресенье - выходной студии
+WEEKDAY_WEIGHTS = (1.0, 1.0, 1.0, 1.1, 1.4, 2.5, 0)
+PEAK_DAY_SHARE = 0.05
+PEAK_DAY_WEIGHT = 4
+
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Петр', 'Елена', 'Алексей', 'Ольга', 'Дмитрий')
+LAST_NAMES = ('Иванова', 'Петров', 'Смирнова', 'Кузнецов', 'Попова', 'Соколов', 'Лебедева', 'Новиков')
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _cumulative(weights):
+    total, result = 0, []
+    for weight in weights:
+        total += weight
+        result.append(total)
+    return result
+
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def seed_users(count, rng, batch_size=BATCH_SIZE):
+    # Хеш пароля считается один раз: PBKDF2 на каждого пользователя занял бы минуты
+    password = make_password(PASSWORD, salt='seed')
+    start = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+    users = (
+        User(username=f'{USERNAME_PREFIX}{number:07d}', email=f'{USERNAME_PREFIX}{number:07d}@example.com',
+             password=password, date_joined=timezone.now())
+        for number in range(start, start + count)
+    )
+    for batch in _batches(users, batch_size):
+        User.objects.bulk_create(batch)
+
+
+def seed_services():
+    existing = {service.name: service for service in Service.objects.all()}
+    Service.objects.bulk_create(
+        Service(name=name, description=name, service_type=service_type, price=price, order=order,
+                min_booking_hours=min_hours, max_booking_hours=max_hours, preparation_time=preparation)
+        for order, (name, service_type, price, min_hours, max_hours, preparation, _) in enumerate(SERVICES)
+        if name not in existing
+    )
+    services = {service.name: service for service in Service.objects.filter(name__in=[row[0] for row in SERVICES])}
+    return [(services[row[0]], row[-1]) for row in SERVICES]
+
+
+class BookingGenerator:
+    """Поток бронирований с реалистичными распределениями"""
+
+    def __init__(self, rng, user_ids, services, today, days_back=DAYS_BACK, days_ahead=DAYS_AHEAD):
+        self.rng = rng
+        self.today = today
+        self.user_ids = user_ids
+        # Небольшая часть клиентов бронирует намного чаще остальных (закон Ципфа)
+        self.user_weights = _cumulative(1 / (rank + 1) ** 0.8 for rank in range(len(user_ids)))
+        self.services = [service for service, _ in services]
+        self.service_weights = _cumulative(weight for _, weight in services)
+
+        self.days = [today + datetime.timedelta(days=offset) for offset in range(-days_back, days_ahead + 1)]
+        peak_days = set(rng.sample(range(len(self.days)), int(len(self.days) * PEAK_DAY_SHARE)))
+        self.day_weights = _cumulative(
+            WEEKDAY_WEIGHTS[day.weekday()] * (PEAK_DAY_WEIGHT if index in peak_days else 1)
+            for index, day in enumerate(self.days)
+        )
+        # Занятые интервалы (минуты от начала дня) и подтвержденные часы по дням
+        self.intervals = defaultdict(list)
+        self.hours = defaultdict(int)
+
+    def _time(self):
+        # Больше всего съемок в середине дня; шаг 30 минут в пределах рабочего окна
+        hours = self.rng.triangular(OPENING_TIME.hour, LAST_START_TIME.hour, 13)
+        slot = min(int(hours * 2), LAST_START_TIME.hour * 2)
+        return datetime.time(slot // 2, 30 * (slot % 2))
+
+    def _duration(self, service):
+        # Короткие съемки встречаются чаще длинных
+        span = service.max_booking_hours - service.min_booking_hours
+        return service.min_booking_hours + int(span * self.rng.random() ** 2 + 0.5)
+
+    def _fits(self, day, start, duration, service, status):
+        """Помещается ли занимающее день бронирование в лимиты студии"""
+        intervals = self.intervals[day]
+        if len(intervals) >= MAX_BOOKINGS_PER_DAY:
+            return False
+        if status in HOURS_STATUSES and self.hours[day] + duration > MAX_HOURS_PER_DAY:
+            return False
+        end = start + (duration + service.preparation_time) * 60
+        return all(end <= other_start or start >= other_end for other_start, other_end in intervals)
+
+    def booking(self):
+        rng = self.rng
+        day = rng.choices(self.days, cum_weights=self.day_weights)[0]
+        service = rng.choices(self.services, cum_weights=self.service_weights)[0]
+        statuses = PAST_STATUSES if day < self.today else FUTURE_STATUSES
+        status = rng.choices([status for status, _ in statuses], [weight for _, weight in statuses])[0]
+        booking_time, duration = self._time(), self._duration(service)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+        if status in BLOCKING_STATUSES:
+            start = booking_time.hour * 60 + booking_time.minute
+            if self._fits(day, start, duration, service, status):
+                self.intervals[day].append((start, start + (duration + service.preparation_time) * 60))
+                if status in HOURS_STATUSES:
+                    self.hours[day] += duration
+            else:
+                # День заполнен: заявку пришлось отклонить
+                status = 'rejected'
+
+        return Booking(
+            id=_uuid(rng),
+            user_id=rng.choices(self.user_ids, cum_weights=self.user_weights)[0],
+            service_id=service.pk,
+            booking_date=day,
+            booking_time=booking_time,
+            duration=duration,
+            client_name=f'{first} {last}',
+            client_phone=f'+7 9{rng.randint(0, 99):02d} {rng.randint(0, 999):03d}-{rng.randint(0, 9999):04d}',
+            client_email=f'client{rng.randint(0, 10 ** 6)}@example.com',
+            status=status,
+        )
+
+
+def seed_bookings(count, rng, batch_size=BATCH_SIZE, services=None, **generator_options):
+    """Бронирования потоком пачек; возвращает множество затронутых дат"""
+    user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+    generator = BookingGenerator(rng, user_ids, services or seed_services(), timezone.localdate(),
+                                 **generator_options)
+
+    dates = set()
+    batches = _batches((generator.booking() for _ in range(count)), batch_size)
+    batches_per_transaction = max(1, TRANSACTION_ROWS // batch_size)
+    # В памяти держится только текущая пачка, транзакция охватывает несколько пачек
+    for first in batches:
+        with transaction.atomic():
+            for batch in itertools.chain([first], itertools.islice(batches, batches_per_transaction - 1)):
+                Booking.objects.bulk_create(batch)
+                BookingSearchToken.objects.bulk_create(
+                    BookingSearchToken(booking_id=booking.pk, token=token)
+                    for booking in batch for token in tokenize(booking)
+                )
+                dates.update(booking.booking_date for booking in batch)
+    return dates
+
+
+def rebuild_derived(dates):
+    """Пересчет того, что при обычном сохранении поддерживают сигналы"""
+    dates = sorted(dates)
+    for start in range(0, len(dates), REBUILD_CHUNK):
+        with transaction.atomic():
+            slots.rebuild_days(dates[start:start + REBUILD_CHUNK])
+    counters.reconcile_user_count()
+    stats.invalidate_admin_stats()
+    page_cache.invalidate(page_cache.PRICES)
+
+
+def seed(bookings, users, seed=0, batch_size=BATCH_SIZE, **generator_options):
+    """Пользователи, услуги и бронирования; на пустой базе одинаковый seed дает одинаковые данные"""
+    rng = random.Random(seed)
+    seed_users(users, rng, batch_size)
+    services = seed_services()
+    dates = seed_bookings(bookings, rng, batch_size, services, **generator_options)
+    rebuild_derived(dates)
@@ -0,0 +1,119 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import backends, counters, page_cache, search, slots, stats
+from .availability import BLOCKING_STATUSES
+from .models import Booking, Photo, Service, Tag
+
+
+def _invalidate_now_and_on_commit(invalidate):
+    """Сброс кеша сразу и еще раз после COMMIT.
+
+    Сразу - чтобы чтения в той же транзакции видели изменение; после COMMIT -
+    потому что до фиксации параллельный запрос читает прежние строки и мог
+    успеть положить их обратно в кеш.
+    """
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def _invalidate_stats(user_ids):
+    def invalidate():
+        stats.invalidate_admin_stats()
+        stats.invalidate_user_stats(user_ids)
+    _invalidate_now_and_on_commit(invalidate)
+
+
+def bookings_changed(dates, user_ids):
+    """Обновление производных данных после изменения бронирований через update()"""
+    slots.rebuild_days(dates)
+    _invalidate_stats(set(user_ids))
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_stats(sender, instance, **kwargs):
+    _invalidate_stats([instance.user_id])
+
+
+@receiver(post_save, sender=Booking)
+def update_slots_on_save(sender, instance, **kwargs):
+    """Обновление индекса слотов при создании, переносе или смене статуса"""
+    dates = {instance.booking_date}
+    previous_date = getattr(instance, '_loaded_values', {}).get('booking_date')
+    if isinstance(previous_date, datetime.date):
+        dates.add(previous_date)
+    slots.rebuild_days(dates)
+
+
+@receiver(post_delete, sender=Booking)
+def update_slots_on_delete(sender, instance, **kwargs):
+    # Отклоненные, отмененные и выполненные бронирования день не занимают
+    if instance.status in BLOCKING_STATUSES:
+        slots.rebuild_days({instance.booking_date})
+
+
+@receiver(post_save, sender=Service)
+def update_slots_on_service_change(sender, instance, created, **kwargs):
+    """Время подготовки услуги влияет на занятость будущих дней"""
+    if created:
+        return
+    dates = Booking.objects.filter(
+        service=instance,
+        booking_date__gte=timezone.now().date(),
+        status__in=BLOCKING_STATUSES,
+    ).order_by().values_list('booking_date', flat=True).distinct()
+    slots.rebuild_days(dates)
+
+
+SEARCH_FIELDS = ('client_name', 'client_phone', 'client_email')
+
+
+@receiver(post_save, sender=Booking)
+def update_search_index(sender, instance, created, **kwargs):
+    """Переиндексация только если изменились поля, по которым идет поиск"""
+    loaded = getattr(instance, '_loaded_values', None)
+    if not created and loaded is not None and all(
+        loaded.get(field) == getattr(instance, field) for field in SEARCH_FIELDS
+    ):
+        return
+    search.index_booking(instance)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_prices_pages(sender, **kwargs):
+    page_cache.invalidate(page_cache.PRICES)
+
+
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(m2m_changed, sender=Photo.tags.through)
+def invalidate_gallery_pages(sender, **kwargs):
+    page_cache.invalidate(page_cache.GALLERY)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Смена пароля, прав или блокировка видны со следующего запроса"""
+    user_id = instance.pk
+    _invalidate_now_and_on_commit(lambda: backends.invalidate_user(user_id))
+
+
+@receiver(post_save, sender=User)
+def count_created_user(sender, instance, created, **kwargs):
+    if created:
+        counters.add_users(1)
+
+
+@receiver(post_delete, sender=User)
+def count_deleted_user(sender, instance, **kwargs):
+    counters.add_users(-1)
@@ -0,0 +1,138 @@
+"""Индекс занятости по 15-минутным слотам.
+
+Для каждого дня в DaySchedule хранится битовая маска: бит N занят, если
+интервал [N*15 мин, (N+1)*15 мин) попадает в съемку или подготовку к ней.
+Съемка, заканчивающаяся после полуночи, занимает слоты следующего дня.
+"""
+import datetime
+
+from .availability import BLOCKING_STATUSES, HOURS_STATUSES, OPENING_TIME, LAST_START_TIME
+from .models import Booking, DaySchedule
+
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+ONE_DAY = datetime.timedelta(days=1)
+
+
+def _bits(start, end):
+    return ((1 << (end - start)) - 1) << start
+
+
+def _time_to_slot(value):
+    return (value.hour * 60 + value.minute) // SLOT_MINUTES
+
+
+def _slot_to_time(slot):
+    minutes = slot * SLOT_MINUTES
+    return datetime.time(minutes // 60, minutes % 60)
+
+
+def _slot_count(duration, preparation=0):
+    return (duration + (preparation or 0)) * 60 // SLOT_MINUTES
+
+
+def shooting_slots(booking_time, duration):
+    """Первый и последний слот съемки (включительно)"""
+    first = _time_to_slot(booking_time)
+    return first, first + _slot_count(duration) - 1
+
+
+def slot_to_time(slot):
+    """Время начала слота; слоты после полуночи отображаются по модулю суток"""
+    return _slot_to_time(slot % SLOTS_PER_DAY)
+
+
+def interval_masks(booking_date, booking_time, duration, preparation=0):
+    """Маски интервала [начало, начало + съемка + подготовка) по дням"""
+    start = _time_to_slot(booking_time)
+    end = start + _slot_count(duration, preparation)
+
+    masks = {}
+    day = booking_date
+    while end > 0:
+        if end > start:
+            masks[day] = _bits(max(start, 0), min(end, SLOTS_PER_DAY))
+        start -= SLOTS_PER_DAY
+        end -= SLOTS_PER_DAY
+        day += ONE_DAY
+    return masks
+
+
+def build_masks(rows):
+    """Объединение масок по строкам (дата, время, часы, подготовка)"""
+    masks = {}
+    for booking_date, booking_time, duration, preparation in rows:
+        for day, mask in interval_masks(booking_date, booking_time, duration, preparation).items():
+            masks[day] = masks.get(day, 0) | mask
+    return masks
+
+
+def rebuild_days(dates):
+    """Пересчет индекса для дней, затронутых изменением бронирований"""
+    # Съемка может переходить через полночь, поэтому затрагивается и следующий день,
+    # а для пересчета нужны бронирования предыдущего
+    affected = set()
+    for day in dates:
+        affected.update((day, day + ONE_DAY))
+    if not affected:
+        return
+
+    rows = list(Booking.objects.filter(
+        booking_date__in=affected | {day - ONE_DAY for day in affected},
+        status__in=BLOCKING_STATUSES,
+    ).order_by().values_list('booking_date', 'booking_time', 'duration', 'service__preparation_time', 'status'))
+    masks = build_masks(row[:4] for row in rows)
+
+    schedules = {day: DaySchedule(date=day) for day in affected}
+    for booking_date, booking_time, duration, _, status in rows:
+        schedule = schedules.get(booking_date)
+        if schedule is None:
+            continue
+        schedule.bookings += 1
+        if status in HOURS_STATUSES:
+            schedule.hours += duration
+            schedule.confirmed += 1
+            # Границы самой съемки без подготовки; последний слот может быть за полночью
+            first, last = shooting_slots(booking_time, duration)
+            schedule.first_slot = first if schedule.first_slot is None else min(schedule.first_slot, first)
+            schedule.last_slot = last if schedule.last_slot is None else max(schedule.last_slot, last)
+    for day, schedule in schedules.items():
+        schedule.mask = masks.get(day, 0)
+
+    DaySchedule.objects.bulk_create(
+        sorted(schedules.values(), key=lambda schedule: schedule.date),
+        update_conflicts=True,
+        unique_fields=['date'],
+        update_fields=['slots', 'bookings', 'hours', 'confirmed', 'first_slot', 'last_slot', 'updated_at'],
+    )
+
+
+def _load_masks(dates):
+    return {
+        day: int.from_bytes(bytes(slots), 'big')
+        for day, slots in DaySchedule.objects.filter(date__in=dates).values_list('date', 'slots')
+    }
+
+
+def is_free(booking_date, booking_time, duration, preparation=0):
+    """Свободен ли интервал [начало, начало + съемка + подготовка)"""
+    wanted = interval_masks(booking_date, booking_time, duration, preparation)
+    masks = _load_masks(wanted)
+    return all(not masks.get(day, 0) & mask for day, mask in wanted.items())
+
+
+def suggest_free_slots(booking_date, duration, preparation=0, near=None, limit=3):
+    """Ближайшие к near свободные времена начала в рабочем окне"""
+    masks = _load_masks([booking_date, booking_date + ONE_DAY])
+    combined = masks.get(booking_date, 0) | (masks.get(booking_date + ONE_DAY, 0) << SLOTS_PER_DAY)
+    length = _slot_count(duration, preparation)
+
+    first = _time_to_slot(OPENING_TIME)
+    last = _time_to_slot(LAST_START_TIME)
+    target = _time_to_slot(near) if near else first
+
+    free = [slot for slot in range(first, last + 1)
+            if not combined & _bits(slot, slot + length)]
+    free.sort(key=lambda slot: (abs(slot - target), slot))
+    return [_slot_to_time(slot) for slot in free[:limit]]
@@ -0,0 +1,113 @@
+"""Статистика бронирований для панелей управления.
+
+Кеш общий для всех запросов, поэтому при промахе агрегаты всегда считаются на
+основной базе, даже во view с @read_replica: отстающая реплика не должна
+попасть в кеш на весь TTL.
+"""
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Booking
+from .routers import use_primary
+
+
+ADMIN_STATS_TTL = 60  # секунд
+USER_STATS_TTL = 60 * 60
+REVENUE_STATUSES = ('confirmed', 'completed')
+
+
+def _admin_stats_key(today):
+    return f'booking_stats:admin:{today.isoformat()}'
+
+
+def _admin_aggregates(today):
+    return {
+        'total': Count('id'),
+        'pending': Count('id', filter=Q(status='pending')),
+        'today': Count('id', filter=Q(booking_date=today, status='confirmed')),
+        'upcoming': Count('id', filter=Q(booking_date__gte=today, status='confirmed')),
+        'revenue': Coalesce(
+            Sum(Booking.total_price_expression(), filter=Q(status__in=REVENUE_STATUSES)),
+            Value(0),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    }
+
+
+def get_admin_stats():
+    """Статистика для admin_booking_list одним агрегирующим запросом"""
+    today = timezone.now().date()
+    key = _admin_stats_key(today)
+
+    stats = cache.get(key)
+    if stats is None:
+        with use_primary():
+            stats = Booking.objects.aggregate(**_admin_aggregates(today))
+        cache.set(key, stats, ADMIN_STATS_TTL)
+    return stats
+
+
+async def aget_admin_stats():
+    """Асинхронный вариант get_admin_stats"""
+    today = timezone.now().date()
+    key = _admin_stats_key(today)
+
+    stats = await cache.aget(key)
+    if stats is None:
+        with use_primary():
+            stats = await Booking.objects.aaggregate(**_admin_aggregates(today))
+        await cache.aset(key, stats, ADMIN_STATS_TTL)
+    return stats
+
+
+def invalidate_admin_stats():
+    cache.delete(_admin_stats_key(timezone.now().date()))
+
+
+def _user_stats_key(user_id, today):
+    return f'booking_stats:user:{user_id}:{today.isoformat()}'
+
+
+def _user_aggregates(today):
+    counters = {
+        status: Count('id', filter=Q(status=status))
+        for status, _ in Booking.STATUS_CHOICES
+    }
+    return {
+        'total': Count('id'),
+        'upcoming': Count('id', filter=Q(status='confirmed', booking_date__gte=today)),
+        **counters,
+    }
+
+
+def get_user_stats(user):
+    """Счетчики бронирований пользователя одним запросом по индексу (user, status)"""
+    today = timezone.now().date()
+    key = _user_stats_key(user.pk, today)
+
+    stats = cache.get(key)
+    if stats is None:
+        with use_primary():
+            stats = Booking.objects.filter(user=user).aggregate(**_user_aggregates(today))
+        cache.set(key, stats, USER_STATS_TTL)
+    return stats
+
+
+async def aget_user_stats(user):
+    """Асинхронный вариант get_user_stats"""
+    today = timezone.now().date()
+    key = _user_stats_key(user.pk, today)
+
+    stats = await cache.aget(key)
+    if stats is None:
+        with use_primary():
+            stats = await Booking.objects.filter(user=user).aaggregate(**_user_aggregates(today))
+        await cache.aset(key, stats, USER_STATS_TTL)
+    return stats
+
+
+def invalidate_user_stats(user_ids):
+    today = timezone.now().date()
+    cache.delete_many([_user_stats_key(user_id, today) for user_id in user_ids])
@@ -0,0 +1,37 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from gallery_app import images
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(path, alt='', sizes='100vw', css_class='', lazy=True):
+    """<picture> с AVIF/WebP/JPEG вариантами, srcset/sizes и явными размерами.
+
+    Если варианты еще не собраны командой build_gallery_images,
+    выводится обычный <img> с оригиналом.
+    """
+    entry = images.load_manifest().get(path)
+    loading = 'lazy' if lazy else 'eager'
+
+    if entry is None:
+        return format_html('<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+                           static(path), alt, css_class, loading)
+
+    fallback = entry['variants'][images.FALLBACK_FORMAT]
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((mime, images.srcset(entry['variants'][ext]), sizes)
+         for ext, _, mime, _ in images.FORMATS
+         if ext != images.FALLBACK_FORMAT and ext in entry['variants'])
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" '
+        'alt="{}" class="{}" loading="{}" decoding="async"></picture>',
+        sources, static(fallback[-1]['url']), images.srcset(fallback), sizes,
+        entry['width'], entry['height'], alt, css_class, loading,
+    )
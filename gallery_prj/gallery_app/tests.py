@@ -1,3 +1,1412 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import MD5PasswordHasher
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.template import Context, Template
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.test import AsyncClient, AsyncRequestFactory, Client, TestCase, TransactionTestCase, override_settings
+from gallery_prj import database
+
+from . import (archive, availability, backends, benchmark, booking_calendar, counters, images, notifications,
+               routers, search, seeding, slots, stats, transitions, views)
+from .backends import users_with_email
+from .forms import BookingForm, CustomUserCreationForm
+from .models import (Booking, BookingArchive, BookingHistory, BookingSearchToken, DaySchedule, OutboxEmail, Photo,
+                     Service, SiteCounter)
+
+
+def make_service(**kwargs):
+    defaults = {
+        'name': 'Портрет',
+        'description': 'Портретная съемка',
+        'price': 1000,
+        'service_type': 'PHOTO',
+    }
+    defaults.update(kwargs)
+    return Service.objects.create(**defaults)
+
+
+def make_booking(user, service, booking_date, **kwargs):
+    defaults = {
+        'booking_time': datetime.time(10, 0),
+        'duration': 2,
+        'client_name': 'Клиент',
+        'client_phone': '+7 999 000-00-00',
+        'client_email': 'client@example.com',
+        'status': 'confirmed',
+    }
+    defaults.update(kwargs)
+    return Booking.objects.create(user=user, service=service, booking_date=booking_date, **defaults)
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('client', 'client@example.com', 'pass12345')
+        self.service = make_service()
+        # Понедельник, чтобы в окне гарантированно были и будни, и воскресенья
+        self.today = datetime.date(2030, 1, 7)
+
+    def test_available_dates_single_query(self):
+        with self.assertNumQueries(1):
+            dates = availability.get_available_dates(today=self.today)
+
+        self.assertEqual(dates[0], self.today + datetime.timedelta(days=availability.MIN_LEAD_DAYS))
+        self.assertTrue(all(d.weekday() not in availability.CLOSED_WEEKDAYS for d in dates))
+
+    def test_full_day_is_excluded(self):
+        day = self.today + datetime.timedelta(days=3)
+        for _ in range(availability.MAX_BOOKINGS_PER_DAY):
+            make_booking(self.user, self.service, day, status='pending', duration=1)
+
+        self.assertNotIn(day, availability.get_available_dates(today=self.today))
+
+    def test_hours_limit(self):
+        day = self.today + datetime.timedelta(days=3)
+        make_booking(self.user, self.service, day, duration=availability.MAX_HOURS_PER_DAY)
+        make_booking(self.user, self.service, day + datetime.timedelta(days=1), status='cancelled',
+                     duration=availability.MAX_HOURS_PER_DAY)
+
+        self.assertFalse(availability.check_date_availability(day))
+        self.assertTrue(availability.check_date_availability(day + datetime.timedelta(days=1)))
+
+
+class SlotIndexTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('client', 'client@example.com', 'pass12345')
+        self.service = make_service(preparation_time=1)
+        self.day = datetime.date(2030, 1, 8)
+
+    def test_interval_includes_preparation(self):
+        make_booking(self.user, self.service, self.day, booking_time=datetime.time(10, 0), duration=2)
+
+        # 10:00-12:00 съемка + час подготовки
+        self.assertFalse(slots.is_free(self.day, datetime.time(12, 45), 1))
+        self.assertTrue(slots.is_free(self.day, datetime.time(13, 0), 1))
+        self.assertFalse(slots.is_free(self.day, datetime.time(9, 0), 2))
+
+    def test_index_follows_status_and_date_changes(self):
+        booking = make_booking(self.user, self.service, self.day, status='pending')
+        self.assertFalse(slots.is_free(self.day, datetime.time(10, 0), 1))
+
+        booking = Booking.objects.get(pk=booking.pk)
+        booking.booking_date = self.day + datetime.timedelta(days=1)
+        booking.save()
+        self.assertTrue(slots.is_free(self.day, datetime.time(10, 0), 1))
+        self.assertFalse(slots.is_free(booking.booking_date, datetime.time(10, 0), 1))
+
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertTrue(slots.is_free(booking.booking_date, datetime.time(10, 0), 1))
+
+        booking.status = 'confirmed'
+        booking.save()
+        booking.delete()
+        self.assertTrue(slots.is_free(booking.booking_date, datetime.time(10, 0), 1))
+
+    def test_repeated_saves_of_one_instance(self):
+        booking = make_booking(self.user, self.service, self.day)
+        booking = Booking.objects.get(pk=booking.pk)
+        for day in (10, 11):
+            booking.booking_date = self.day.replace(day=day)
+            booking.save()
+
+        schedules = dict(DaySchedule.objects.filter(bookings__gt=0).values_list('date', 'bookings'))
+        self.assertEqual(schedules, {self.day.replace(day=11): 1})
+
+        # Имя изменено и возвращено: индекс поиска следует за последним сохранением
+        booking.client_name = 'Борис'
+        booking.save()
+        booking.client_name = 'Клиент'
+        booking.save()
+        self.assertEqual(list(search.search_bookings(Booking.objects.all(), 'клиент')), [booking])
+
+    def test_overnight_booking_spills_into_next_day(self):
+        make_booking(self.user, self.service, self.day, booking_time=datetime.time(21, 0), duration=4)
+
+        self.assertFalse(slots.is_free(self.day + datetime.timedelta(days=1), datetime.time(1, 30), 1))
+        self.assertTrue(slots.is_free(self.day + datetime.timedelta(days=1), datetime.time(2, 0), 1))
+
+    def test_check_is_single_query(self):
+        make_booking(self.user, self.service, self.day)
+        with self.assertNumQueries(1):
+            slots.is_free(self.day, datetime.time(15, 0), 2, 1)
+
+    def test_suggest_nearest_free_slots(self):
+        make_booking(self.user, self.service, self.day, booking_time=datetime.time(10, 0), duration=2)
+
+        suggestions = slots.suggest_free_slots(self.day, 1, 1, near=datetime.time(11, 0), limit=2)
+        self.assertEqual(suggestions, [datetime.time(13, 0), datetime.time(13, 15)])
+
+    def test_form_rejects_overlap(self):
+        day = datetime.date.today() + datetime.timedelta(days=10)
+        if day.weekday() in availability.CLOSED_WEEKDAYS:
+            day += datetime.timedelta(days=1)
+        make_booking(self.user, self.service, day, booking_time=datetime.time(10, 0), duration=2)
+
+        form = BookingForm(data={
+            'service': self.service.pk,
+            'booking_date': day.isoformat(),
+            'booking_time': '11:00',
+            'duration': 1,
+            'client_name': 'Другой клиент',
+            'client_phone': '+7 999 111-11-11',
+            'client_email': 'other@example.com',
+            'confirm_terms': True,
+        })
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('13:00', str(form.errors['booking_time']))
+
+
+class AdminStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('client', 'client@example.com', 'pass12345')
+        self.service = make_service(price=1000)
+        today = datetime.date.today()
+        make_booking(self.user, self.service, today, duration=2)
+        make_booking(self.user, self.service, today, duration=3, price_agreed=500, status='completed')
+        make_booking(self.user, self.service, today + datetime.timedelta(days=5), status='pending')
+
+    def test_stats_in_one_query_then_cached(self):
+        with self.assertNumQueries(1):
+            result = stats.get_admin_stats()
+        with self.assertNumQueries(0):
+            stats.get_admin_stats()
+
+        self.assertEqual(result['total'], 3)
+        self.assertEqual(result['pending'], 1)
+        self.assertEqual(result['today'], 1)
+        self.assertEqual(result['upcoming'], 1)
+        self.assertEqual(result['revenue'], 2500)
+
+    def test_cache_invalidated_on_booking_change(self):
+        stats.get_admin_stats()
+        make_booking(self.user, self.service, datetime.date.today(), duration=1)
+
+        self.assertEqual(stats.get_admin_stats()['revenue'], 3500)
+
+    def test_stats_cached_before_commit_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            make_booking(self.user, self.service, datetime.date.today(), duration=1)
+            # Параллельный запрос до COMMIT видит прежние строки и кеширует их
+            cache.set(stats._admin_stats_key(datetime.date.today()), {'total': 3})
+        self.assertEqual(stats.get_admin_stats()['total'], 4)
+
+
+class ListingQueryCountTests(TestCase):
+    """Количество запросов на страницу не зависит от числа строк"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client.force_login(self.user)
+        self.services = [make_service(name=f'Услуга {i}') for i in range(3)]
+
+    def _add_bookings(self, count):
+        for i in range(count):
+            make_booking(self.user, self.services[i % 3], datetime.date(2030, 1, 1) + datetime.timedelta(days=i))
+
+    def _assert_constant(self, url, queries):
+        # Сессия и пользователь после первого запроса читаются из кеша
+        self.client.get(url)
+        self._add_bookings(3)
+        with self.assertNumQueries(queries):
+            self.client.get(url)
+
+        self._add_bookings(20)
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_bookings(self):
+        # статистика (сброшена новыми бронированиями) и страница
+        self._assert_constant('/booking/my/', 2)
+        # статистика уже в кеше
+        with self.assertNumQueries(1):
+            self.client.get('/booking/my/', {'status': 'confirmed', 'page': 2})
+
+    def test_user_stats_ignore_status_filter(self):
+        self._add_bookings(12)
+        Booking.objects.filter(booking_date=datetime.date(2030, 1, 1)).update(status='pending')
+
+        response = self.client.get('/booking/my/', {'status': 'confirmed', 'page': 2})
+        self.assertEqual(response.context['stats']['total'], 12)
+        self.assertEqual(response.context['stats']['pending'], 1)
+        self.assertEqual(response.context['page_obj'].paginator.count, 11)
+        self.assertEqual(len(response.context['page_obj'].object_list), 1)
+
+    def test_booking_admin_changelist(self):
+        self._assert_constant('/admin/gallery_app/booking/', 6)
+
+    def test_listing_queryset_touches_no_relations(self):
+        self._add_bookings(5)
+        with self.assertNumQueries(1):
+            for booking in Booking.objects.for_listing():
+                str(booking)
+                booking.get_total_price()
+                booking.user.email
+
+
+class BookingSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.service = make_service(name='Свадебная съемка')
+        self.other_service = make_service(name='Портрет')
+        self.ivan = make_booking(self.user, self.service, datetime.date(2030, 1, 8),
+                                 client_name='Иван Петров', client_phone='+7 (999) 123-45-67',
+                                 client_email='ivan.petrov@mail.ru')
+        self.anna = make_booking(self.user, self.other_service, datetime.date(2030, 1, 9),
+                                 client_name='Анна Смирнова', client_phone='8 916 000 11 22',
+                                 client_email='anna@example.com')
+
+    def _search(self, query):
+        return set(search.search_bookings(Booking.objects.all(), query))
+
+    def test_prefix_on_names_and_emails(self):
+        self.assertEqual(self._search('пет'), {self.ivan})
+        self.assertEqual(self._search('Анна см'), {self.anna})
+        self.assertEqual(self._search('ivan.pet'), {self.ivan})
+        self.assertEqual(self._search('example'), {self.anna})
+
+    def test_phone_digits(self):
+        self.assertEqual(self._search('+7 999 123'), {self.ivan})
+        self.assertEqual(self._search('916-000'), {self.anna})
+
+    def test_service_and_booking_id(self):
+        self.assertEqual(self._search('свадеб'), {self.ivan})
+        self.assertEqual(self._search(str(self.anna.id)[:8]), {self.anna})
+
+    def test_index_follows_changes(self):
+        self.ivan.client_name = 'Пётр Сидоров'
+        self.ivan.save()
+
+        self.assertEqual(self._search('сидор'), {self.ivan})
+        self.assertEqual(self._search('иван'), set())
+        self.assertEqual(self._search('petrov'), {self.ivan})  # email не менялся
+
+        booking = Booking.objects.get(pk=self.ivan.pk)
+        booking.client_email = 'petr@mail.ru'
+        booking.save()
+        self.assertEqual(self._search('petrov'), set())
+
+    def test_admin_changelist_uses_index(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/admin/gallery_app/booking/', {'q': 'смирн'})
+
+        self.assertEqual(list(response.context['cl'].result_list), [self.anna])
+
+
+try:
+    import PIL
+except ImportError:
+    PIL = None
+
+
+class ResponsiveImageTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.static_dir = Path(tmp.name)
+        (self.static_dir / images.SOURCE_DIR).mkdir()
+
+        settings_override = override_settings(STATICFILES_DIRS=[self.static_dir])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _render(self, path):
+        return Template('{% load gallery_images %}{% responsive_image path alt="Фото" sizes="50vw" %}').render(
+            Context({'path': path})
+        )
+
+    def test_fallback_without_manifest(self):
+        html = self._render('images/image-1.png')
+
+        self.assertIn('src="/static/images/image-1.png"', html)
+        self.assertNotIn('srcset', html)
+
+    @unittest.skipIf(PIL is None, 'Pillow не установлен')
+    def test_build_and_render_variants(self):
+        from PIL import Image
+
+        Image.new('RGB', (1000, 750), 'gray').save(self.static_dir / images.SOURCE_DIR / 'image-1.png')
+        call_command('build_gallery_images', stdout=io.StringIO())
+
+        entry = images.load_manifest()['images/image-1.png']
+        self.assertEqual([v['width'] for v in entry['variants']['webp']], [320, 480, 800, 1000])
+        for variant in entry['variants']['jpg']:
+            self.assertTrue((self.static_dir / variant['url']).exists())
+            self.assertRegex(variant['url'], r'image-1-\d+\.[0-9a-f]{10}\.jpg$')
+
+        html = self._render('images/image-1.png')
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('width="1000" height="750"', html)
+        self.assertIn('800w', html)
+
+
+class PhotoGalleryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Миграция 0013 добавляет изображения из static/images; тестам нужна пустая галерея
+        self.bundled = list(Photo.objects.values_list('image', flat=True))
+        Photo.objects.all().delete()
+
+    def test_bundled_images_ingested_by_migration(self):
+        if PIL is None:
+            self.skipTest('Pillow не установлен')
+        source_dir = images.static_root() / images.SOURCE_DIR
+        self.assertEqual(sorted(self.bundled), sorted(f'{images.SOURCE_DIR}/{p.name}' for p in source_dir.glob('*.png')))
+        self.assertEqual(self.bundled[:3], ['images/image-1.png', 'images/image-2.png', 'images/image-3.png'])
+
+    def _make_photos(self, count):
+        for i in range(count):
+            Photo.objects.create(image=f'images/image-{i}.png', width=1280, height=960,
+                                 file_size=1000, order=i)
+
+    def test_home_paginates_from_index(self):
+        self._make_photos(30)
+        Photo.objects.filter(order=0).update(is_published=False)
+
+        response = self.client.get('/home/')
+        self.assertEqual(len(response.context['page_obj'].object_list), 24)
+        self.assertEqual(response.context['page_obj'].object_list[0].image, 'images/image-1.png')
+
+        response = self.client.get('/home/', {'page': 2})
+        self.assertEqual(len(response.context['page_obj'].object_list), 5)
+
+        response = self.client.get('/gallery/')
+        self.assertEqual(len(response.context['photos']), 24)
+        self.assertContains(response, 'data-next=')
+
+    def test_unknown_photo_is_404(self):
+        self._make_photos(1)
+        photo = Photo.objects.get()
+
+        self.assertEqual(self.client.get(f'/gallery/photo/{photo.id}/').status_code, 200)
+        self.assertEqual(self.client.get(f'/gallery/photo/{photo.id + 100}/').status_code, 404)
+
+    def test_api_keyset_pages_cover_all_photos(self):
+        self._make_photos(25)
+        Photo.objects.filter(order__in=[3, 4]).update(order=3)  # одинаковый order, порядок по id
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {'limit': 10}
+            if cursor:
+                params['after'] = cursor
+            with self.assertNumQueries(1):
+                data = self.client.get('/gallery/api/photos/', params).json()
+            seen += [photo['id'] for photo in data['results']]
+            pages += 1
+            cursor = data['next']
+            if not cursor:
+                break
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, list(Photo.objects.order_by('order', 'id').values_list('id', flat=True)))
+        self.assertEqual(data['results'][0]['width'], 1280)
+
+    def test_api_rejects_bad_cursor(self):
+        response = self.client.get('/gallery/api/photos/', {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    @unittest.skipIf(PIL is None, 'Pillow не установлен')
+    def test_ingest_extracts_metadata_once(self):
+        from PIL import Image
+
+        with tempfile.TemporaryDirectory() as static_dir, \
+                override_settings(STATICFILES_DIRS=[static_dir]):
+            source_dir = Path(static_dir) / images.SOURCE_DIR
+            source_dir.mkdir()
+            for name in ('image-10.png', 'image-2.png'):
+                Image.new('RGB', (40, 30), (200, 10, 10)).save(source_dir / name)
+
+            call_command('ingest_photos', '--tag', 'портрет', stdout=io.StringIO())
+            call_command('ingest_photos', stdout=io.StringIO())
+
+        photos = list(Photo.objects.all())
+        self.assertEqual([p.image for p in photos], ['images/image-2.png', 'images/image-10.png'])
+        self.assertEqual((photos[0].width, photos[0].height), (40, 30))
+        self.assertEqual(photos[0].dominant_color, '#c80a0a')
+        self.assertEqual(list(photos[0].tags.values_list('name', flat=True)), ['портрет'])
+
+    @unittest.skipIf(PIL is None, 'Pillow не установлен')
+    def test_admin_add_reads_metadata(self):
+        from PIL import Image
+
+        admin_user = User.objects.create_superuser('boss', 'boss@example.com', 'pass12345')
+        self.client.force_login(admin_user)
+        form = {'title': 'Новая', 'order': 1, 'is_published': 'on'}
+        with tempfile.TemporaryDirectory() as static_dir, \
+                override_settings(STATICFILES_DIRS=[static_dir]):
+            source_dir = Path(static_dir) / images.SOURCE_DIR
+            source_dir.mkdir()
+            Image.new('RGB', (40, 30), (200, 10, 10)).save(source_dir / 'new.png')
+
+            response = self.client.post('/admin/gallery_app/photo/add/', {**form, 'image': 'images/missing.png'})
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(Photo.objects.filter(image='images/missing.png').exists())
+
+            response = self.client.post('/admin/gallery_app/photo/add/', {**form, 'image': 'images/new.png'})
+
+        self.assertEqual(response.status_code, 302)
+        photo = Photo.objects.get(image='images/new.png')
+        self.assertEqual((photo.width, photo.height, photo.dominant_color), (40, 30, '#c80a0a'))
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.service = make_service(name='Портрет', price=1000)
+
+    def test_prices_served_from_cache_until_service_changes(self):
+        self.client.get('/prices/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/prices/')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+        self.service.price = 2500
+        self.service.save()
+        response = self.client.get('/prices/')
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, '2500')
+
+    def test_gallery_invalidated_by_photo_changes(self):
+        self.client.get('/home/')
+        Photo.objects.create(image='images/new.png', width=10, height=10, file_size=10)
+
+        response = self.client.get('/home/')
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'images/new.png')
+
+    def test_authenticated_users_bypass_cache(self):
+        user = User.objects.create_user('client', 'client@example.com', 'pass12345')
+        self.client.get('/prices/')
+        self.client.force_login(user)
+
+        response = self.client.get('/prices/')
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertContains(response, 'client')
+
+
+class UserCounterTests(TestCase):
+    def test_counter_follows_users(self):
+        start = counters.get_user_count()
+        user = User.objects.create_user('client', 'client@example.com', 'pass12345')
+        User.objects.create_user('other', 'other@example.com', 'pass12345')
+        user.save()  # повторное сохранение не меняет счетчик
+        self.assertEqual(counters.get_user_count(), start + 2)
+
+        user.delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(counters.get_user_count(), start + 1)
+
+    def test_reconcile_fixes_drift(self):
+        User.objects.bulk_create([User(username='a'), User(username='b')])  # в обход сигналов
+        out = io.StringIO()
+        call_command('reconcile_counters', stdout=out)
+
+        self.assertIn('Расхождение', out.getvalue())
+        self.assertEqual(counters.get_user_count(), User.objects.count())
+
+    def test_missing_counter_is_rebuilt(self):
+        SiteCounter.objects.all().delete()
+        User.objects.create_user('client', 'client@example.com', 'pass12345')
+
+        self.assertEqual(counters.get_user_count(), User.objects.count())
+
+
+class BookingCalendarTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client.force_login(self.admin)
+        self.service = make_service(name='Свадьба')
+        self.day = datetime.date(2030, 3, 12)
+        make_booking(self.admin, self.service, self.day, booking_time=datetime.time(10, 0), duration=2)
+        make_booking(self.admin, self.service, self.day, booking_time=datetime.time(22, 0), duration=3)
+        make_booking(self.admin, self.service, self.day, booking_time=datetime.time(15, 0), status='pending')
+
+    def test_summary_maintained_on_changes(self):
+        summary = booking_calendar.get_summaries(self.day, self.day + datetime.timedelta(days=1))[self.day]
+        self.assertEqual((summary.bookings, summary.hours), (2, 5))
+        self.assertEqual((summary.start, summary.end), (datetime.time(10, 0), datetime.time(1, 0)))
+
+        Booking.objects.get(booking_time=datetime.time(22, 0)).delete()
+        Booking.objects.filter(status='pending').get().save()
+        summary = booking_calendar.get_summaries(self.day, self.day + datetime.timedelta(days=1))[self.day]
+        self.assertEqual((summary.bookings, summary.end), (1, datetime.time(12, 0)))
+
+    def test_month_view_single_query(self):
+        with self.assertNumQueries(1):
+            weeks = booking_calendar.month_view(2030, 3)
+
+        days = {summary.date: summary for week in weeks for summary in week}
+        self.assertEqual(weeks[0][0].date.weekday(), 0)
+        self.assertEqual(days[self.day].bookings, 2)
+        self.assertEqual(days[self.day + datetime.timedelta(days=1)].bookings, 0)
+
+    def test_json_feed(self):
+        response = self.client.get('/admin/calendar/feed.json', {'start': '2030-03-01', 'end': '2030-04-01'})
+        self.assertEqual(response.json()['days'], [
+            {'date': '2030-03-12', 'bookings': 2, 'hours': 5, 'start': '10:00', 'end': '01:00'},
+        ])
+
+        response = self.client.get('/admin/calendar/feed.json', {'start': '2030-03-01', 'end': '2032-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_ics_feed(self):
+        response = self.client.get('/admin/calendar/feed.ics', {'start': '2030-03-12', 'end': '2030-03-13'})
+        content = response.content.decode()
+
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertEqual(content.count('BEGIN:VEVENT'), 2)
+        self.assertIn('DTSTART:20300312T220000Z\r\nDTEND:20300313T010000Z', content)
+        self.assertIn('SUMMARY:Свадьба: Клиент', content)
+
+    def test_page_renders_each_view(self):
+        response = self.client.get('/admin/calendar/', {'year': 2030, 'month': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '2 съем., 5 ч')
+        self.assertContains(response, '10:00–01:00')
+
+        response = self.client.get('/admin/calendar/', {'view': 'week', 'date': '2030-03-14'})
+        self.assertEqual(len(response.context['days']), 7)
+        self.assertContains(response, '2 съем., 5 ч, 10:00–01:00')
+
+        response = self.client.get('/admin/calendar/', {'view': 'day', 'date': '2030-03-12'})
+        self.assertContains(response, 'Свадьба', count=2)
+        self.assertContains(response, '22:00')
+        self.assertNotContains(response, '15:00')
+
+    def test_feeds_require_admin(self):
+        self.client.force_login(User.objects.create_user('client', 'client@example.com', 'pass12345'))
+        self.assertEqual(self.client.get('/admin/calendar/feed.json').status_code, 302)
+
+
+class BulkTransitionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.service = make_service()
+
+    def _pending(self, count, start=datetime.date(2030, 1, 1)):
+        return [make_booking(self.admin, self.service, start + datetime.timedelta(days=i), status='pending')
+                for i in range(count)]
+
+    def _transition(self, status='confirmed'):
+        return transitions.bulk_transition(Booking.objects.all(), status, user=self.admin)
+
+    def test_query_count_does_not_grow(self):
+        self._pending(3)
+        with self.assertNumQueries(9) as few:
+            self._transition()
+
+        Booking.objects.update(status='pending')
+        self._pending(40, start=datetime.date(2031, 1, 1))
+        with self.assertNumQueries(len(few)):
+            self._transition()
+
+    def test_history_notifications_and_derived_data(self):
+        bookings = self._pending(3)
+        make_booking(self.admin, self.service, datetime.date(2030, 1, 1), status='completed')
+        stats.get_admin_stats()
+
+        result = self._transition()
+
+        self.assertEqual(result, (3, 1))
+        self.assertEqual(Booking.objects.filter(status='confirmed', admin_user=self.admin).count(), 3)
+        self.assertEqual(BookingHistory.objects.filter(old_status='pending', new_status='confirmed').count(), 3)
+        self.assertEqual(OutboxEmail.objects.filter(status='pending', to='client@example.com').count(), 3)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(DaySchedule.objects.get(date=bookings[0].booking_date).confirmed, 1)
+        self.assertEqual(stats.get_admin_stats()['pending'], 0)
+
+    def test_invalid_transitions_skipped(self):
+        self._pending(2)
+        self._transition('rejected')
+
+        self.assertEqual(self._transition('completed'), (0, 2))
+        self.assertFalse(BookingHistory.objects.filter(new_status='completed').exists())
+
+    def test_admin_action(self):
+        booking = self._pending(1)[0]
+        self.client.force_login(self.admin)
+        self.client.post('/admin/gallery_app/booking/', {
+            'action': 'confirm_bookings',
+            '_selected_action': [str(booking.pk)],
+        })
+
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'confirmed')
+        self.assertEqual(booking.history.get().changed_by, self.admin)
+
+
+class FailingBackend(locmem.EmailBackend):
+    def send_messages(self, messages):
+        if any(message.to == ['broken@example.com'] for message in messages):
+            raise ConnectionError('SMTP недоступен')
+        return super().send_messages(messages)
+
+
+class UnreachableBackend(locmem.EmailBackend):
+    def open(self):
+        raise ConnectionRefusedError('SMTP недоступен')
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('client', 'client@example.com', 'pass12345')
+        self.service = make_service()
+        self.booking = make_booking(self.user, self.service, datetime.date(2030, 1, 1), status='pending')
+
+    def test_enqueued_in_same_transaction(self):
+        try:
+            with transaction.atomic():
+                transitions.bulk_transition(Booking.objects.all(), 'confirmed')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(OutboxEmail.objects.exists())
+
+        transitions.bulk_transition(Booking.objects.all(), 'confirmed')
+        self.assertEqual(OutboxEmail.objects.get().booking_id, self.booking.pk)
+
+    def test_drain_sends_batch(self):
+        for _ in range(3):
+            notifications.enqueue_status_notifications([self.booking])
+        Booking.objects.update(status='confirmed')
+        notifications.enqueue_status_notifications(Booking.objects.for_listing())
+
+        output = io.StringIO()
+        call_command('send_outbox', batch_size=2, stdout=output)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Бронирование подтверждено')
+        self.assertFalse(OutboxEmail.objects.exclude(status='sent').exists())
+
+    def test_failure_backs_off_then_gives_up(self):
+        self.booking.status = 'cancelled'
+        self.booking.client_email = 'broken@example.com'
+        notifications.enqueue_status_notifications([self.booking])
+        self.booking.client_email = 'client@example.com'
+        notifications.enqueue_status_notifications([self.booking])
+
+        connection = FailingBackend()
+        self.assertEqual(notifications.drain_outbox(connection=connection), (1, 1))
+        failed = OutboxEmail.objects.get(to='broken@example.com')
+        self.assertEqual((failed.status, failed.attempts), ('pending', 1))
+        self.assertGreater(failed.next_attempt_at, timezone.now())
+        self.assertEqual(notifications.drain_outbox(connection=connection), (0, 0))
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now(), attempts=notifications.MAX_ATTEMPTS - 1)
+        notifications.drain_outbox(connection=connection)
+        self.assertEqual(OutboxEmail.objects.get(to='broken@example.com').status, 'failed')
+
+    def test_unreachable_server_defers_batch(self):
+        self.booking.status = 'cancelled'
+        notifications.enqueue_status_notifications([self.booking, self.booking])
+
+        self.assertEqual(notifications.drain_outbox(connection=UnreachableBackend()), (0, 2))
+        for email in OutboxEmail.objects.all():
+            self.assertEqual((email.status, email.attempts, email.last_error), ('pending', 1, 'SMTP недоступен'))
+            self.assertGreater(email.next_attempt_at, timezone.now())
+
+    def test_user_cancellation_is_queued(self):
+        booking = make_booking(self.user, self.service, timezone.localdate() + datetime.timedelta(days=10))
+        self.client.force_login(self.user)
+        self.client.post(f'/booking/{booking.pk}/cancel/')
+
+        self.assertEqual(booking.history.get().new_status, 'cancelled')
+        self.assertEqual(OutboxEmail.objects.get(booking=booking).subject, 'Бронирование отменено')
+
+
+@override_settings(PERF_SAMPLE_RATE=1.0, PERF_SLOW_REQUEST_MS=10_000, PERF_SERVER_TIMING=True)
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_service()
+
+    def test_sampled_request_metrics(self):
+        with self.assertLogs('gallery_app.performance', 'INFO') as logs:
+            response = self.client.get('/prices/')
+
+        data = logs.records[0].performance
+        self.assertEqual(data['url_name'], 'gallery:prices')
+        self.assertEqual(data['bytes'], len(response.content))
+        self.assertGreater(data['queries'], 0)
+        self.assertGreater(data['template_ms'], 0)
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", template')
+
+    def test_track_spans(self):
+        User.objects.create_user('client', 'client@example.com', 'pass12345')
+        with self.assertLogs('gallery_app.performance', 'INFO') as logs:
+            self.client.post('/login/', {'username': 'client', 'password': 'pass12345'})
+
+        self.assertIn('auth', logs.records[0].performance['spans'])
+
+    @override_settings(PERF_SAMPLE_RATE=0.0)
+    def test_unsampled_request_is_silent(self):
+        with self.assertNoLogs('gallery_app.performance'):
+            response = self.client.get('/prices/')
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PERF_SAMPLE_RATE=0.0, PERF_SLOW_REQUEST_MS=0)
+    def test_slow_request_always_logged(self):
+        with self.assertLogs('gallery_app.performance', 'WARNING') as logs:
+            self.client.get('/prices/')
+
+        self.assertNotIn('queries', logs.records[0].performance)
+
+
+class BenchmarkTests(TestCase):
+    def test_seed_is_deterministic_and_rebuilds_derived_data(self):
+        seeding.seed(bookings=60, users=5, seed=7)
+        ids = set(Booking.objects.values_list('id', flat=True))
+        Booking.objects.all().delete()
+        seeding.seed(bookings=60, users=0, seed=7)
+
+        self.assertEqual(set(Booking.objects.values_list('id', flat=True)), ids)
+        self.assertEqual(counters.get_user_count(), User.objects.count())
+        self.assertTrue(BookingSearchToken.objects.filter(token='иванова').exists())
+        day = Booking.objects.filter(status__in=availability.BLOCKING_STATUSES).values_list(
+            'booking_date', flat=True).first()
+        self.assertEqual(
+            DaySchedule.objects.get(date=day).bookings,
+            Booking.objects.filter(booking_date=day, status__in=availability.BLOCKING_STATUSES).count(),
+        )
+
+    def test_seed_gallery_distributions(self):
+        call_command('seed_gallery', bookings=400, users=20, seed=3, stdout=io.StringIO())
+
+        today = timezone.localdate()
+        rows = Booking.objects.values_list(
+            'booking_date', 'booking_time', 'duration', 'status',
+            'service__min_booking_hours', 'service__max_booking_hours',
+        )
+        self.assertEqual(len(rows), 400)
+        for day, start, duration, status, min_hours, max_hours in rows:
+            self.assertNotIn(day.weekday(), availability.CLOSED_WEEKDAYS)
+            self.assertTrue(availability.OPENING_TIME <= start <= availability.LAST_START_TIME)
+            self.assertTrue(min_hours <= duration <= max_hours)
+            if day >= today:
+                self.assertNotEqual(status, 'completed')
+
+        saturdays = sum(1 for row in rows if row[0].weekday() == 5)
+        mondays = sum(1 for row in rows if row[0].weekday() == 0)
+        self.assertGreater(saturdays, mondays)
+
+        # Вместимость студии не превышена ни в один день
+        for schedule in DaySchedule.objects.all():
+            self.assertLessEqual(schedule.bookings, availability.MAX_BOOKINGS_PER_DAY)
+            self.assertLessEqual(schedule.hours, availability.MAX_HOURS_PER_DAY)
+
+    def test_run_reports_metrics(self):
+        seeding.seed(bookings=30, users=3)
+        result = benchmark.run(iterations=2, warmup=1, only=['home', 'user_bookings'])
+
+        self.assertEqual(set(result['results']), {'home', 'user_bookings'})
+        metrics = result['results']['user_bookings']
+        self.assertEqual(metrics['statuses'], [200])
+        self.assertLessEqual(metrics['p50_ms'], metrics['p99_ms'])
+        self.assertGreater(metrics['queries'], 0)
+        self.assertEqual(benchmark.compare(result, result)[0]['p50_ratio'], 1.0)
+
+    @override_settings(PERF_SAMPLE_RATE=1.0, PERF_SLOW_REQUEST_MS=0)
+    def test_run_without_profiling_logs(self):
+        seeding.seed(bookings=10, users=2)
+        with self.assertNoLogs('gallery_app.performance'):
+            result = benchmark.run(iterations=2, warmup=0, only=['home'])
+        self.assertEqual(result['results']['home']['statuses'], [200])
+
+    def test_scenarios_get_expected_statuses(self):
+        seeding.seed(bookings=200, users=5)
+        scenarios = ['create_booking', 'admin_booking_list', 'admin_booking_search', 'admin_calendar']
+        result = benchmark.run(iterations=2, warmup=1, only=scenarios)
+        self.assertEqual({name: metrics['statuses'] for name, metrics in result['results'].items()}, {
+            'create_booking': [302], 'admin_booking_list': [200], 'admin_booking_search': [200],
+            'admin_calendar': [200],
+        })
+
+        with mock.patch.dict(benchmark.EXPECTED_STATUSES, {'home': 404}):
+            with self.assertRaisesMessage(benchmark.BenchmarkError, 'home: статусы [200], ожидался 404'):
+                benchmark.run(iterations=1, warmup=0, only=['home'])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client.force_login(self.admin)
+        self.service = make_service(name='Портрет', price=1000)
+        make_booking(self.admin, self.service, datetime.date(2029, 5, 1), duration=3, client_name='Анна; "Ко"')
+        make_booking(self.admin, self.service, datetime.date(2030, 5, 1), price_agreed=2500, status='pending')
+        make_booking(self.admin, self.service, datetime.date(2031, 5, 1))
+
+    def _content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_csv_with_sql_totals_and_filters(self):
+        response = self.client.get('/admin/bookings/export/', {'start': '2029-01-01', 'end': '2030-12-31'})
+        rows = list(csv.reader(io.StringIO(self._content(response).decode('utf-8-sig')), delimiter=';'))
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(rows[0][0], 'ID')
+        self.assertEqual([(row[2], row[5], row[9], row[10]) for row in rows[1:]], [
+            ('2029-05-01', 'Анна; "Ко"', 'Подтверждено', '3000.00'),
+            ('2030-05-01', 'Клиент', 'Ожидает подтверждения', '2500.00'),
+        ])
+
+    def test_csv_neutralizes_formulas(self):
+        Booking.objects.update(client_name='=HYPERLINK("http://evil")', client_phone='+7 999 000-00-00')
+        response = self.client.get('/admin/bookings/export/', {'status': 'pending'})
+        row = list(csv.reader(io.StringIO(self._content(response).decode('utf-8-sig')), delimiter=';'))[1]
+
+        self.assertEqual(row[5], '\'=HYPERLINK("http://evil")')
+        self.assertEqual(row[6], "'+7 999 000-00-00")
+        self.assertEqual(row[2], '2030-05-01')
+
+    def test_xlsx_is_valid_workbook(self):
+        response = self.client.get('/admin/bookings/export/', {'format': 'xlsx', 'status': 'confirmed'})
+        with zipfile.ZipFile(io.BytesIO(self._content(response))) as archive:
+            self.assertIn('xl/workbook.xml', archive.namelist())
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+
+        self.assertEqual(sheet.count('<row>'), 3)
+        self.assertIn('<t>Анна; "Ко"</t>', sheet)
+        # 2029-05-01 в виде порядкового номера дня Excel
+        self.assertIn('<c s="1"><v>47239</v></c>', sheet)
+
+    def test_constant_queries(self):
+        self.client.get('/admin/bookings/export/')
+        # Сессия и пользователь из кеша: только выборка строк
+        with self.assertNumQueries(1) as few:
+            self._content(self.client.get('/admin/bookings/export/'))
+        for day in range(20):
+            make_booking(self.admin, self.service, datetime.date(2032, 1, 1) + datetime.timedelta(days=day))
+        with self.assertNumQueries(len(few)):
+            self._content(self.client.get('/admin/bookings/export/'))
+
+    def test_admin_action(self):
+        response = self.client.post('/admin/gallery_app/booking/', {
+            'action': 'export_csv',
+            '_selected_action': list(Booking.objects.values_list('pk', flat=True)),
+        })
+        self.assertEqual(self._content(response).decode('utf-8-sig').count('\n'), 4)
+
+
+class AsyncViewTests(TestCase):
+    """Async-варианты публичных страниц и эндпоинтов статистики под ASGI"""
+
+    def setUp(self):
+        cache.clear()
+        self.service = make_service(name='Портрет', price=1000)
+        self.user = User.objects.create_user('client', 'client@example.com', 'pass12345')
+        for day in range(3):
+            make_booking(self.user, self.service, datetime.date(2030, 1, 1) + datetime.timedelta(days=day))
+        Photo.objects.create(title='Закат', image='images/sunset.png', width=10, height=10, file_size=10)
+
+    async def test_public_pages_and_cache(self):
+        client = AsyncClient()
+        for url in ('/', '/prices/', '/gallery/'):
+            response = await client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(await client.get('/prices/'), 'Портрет')
+        self.assertEqual((await client.get('/gallery/'))['X-Page-Cache'], 'hit')
+
+        photo = await Photo.objects.afirst()
+        self.assertContains(await client.get(f'/gallery/photo/{photo.pk}/'), 'Закат')
+        self.assertEqual((await client.get('/gallery/photo/999999/')).status_code, 404)
+
+    async def test_user_bookings_and_stats(self):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        response = await client.get('/booking/my/')
+        self.assertEqual(len(response.context['page_obj'].object_list), 3)
+        self.assertContains(response, 'client')
+
+        response = await client.get('/booking/my/stats/')
+        self.assertEqual(response.json()['total'], 3)
+        self.assertEqual(response.json()['confirmed'], 3)
+
+    async def test_admin_stats(self):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        self.assertEqual((await client.get('/admin/stats/')).status_code, 302)
+
+        admin = await User.objects.acreate(username='admin', is_staff=True)
+        await client.aforce_login(admin)
+        data = (await client.get('/admin/stats/')).json()
+        self.assertEqual(data['total'], 3)
+        self.assertEqual(data['upcoming'], 3)
+        self.assertEqual(data['outbox_pending'], 0)
+
+    async def test_pages_load_user_without_page_cache(self):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        session_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+        session_store = import_string(f'{settings.SESSION_ENGINE}.SessionStore')
+
+        for view in (views.home_view, views.prices_view, views.gallery_view):
+            # Без cached_page пользователя заранее никто не загрузил; сессия и пользователь не в кеше
+            await cache.aclear()
+            request = AsyncRequestFactory().get('/')
+            request.session = session_store(session_key)
+            AuthenticationMiddleware(lambda request: None).process_request(request)
+
+            response = await view.__wrapped__(request)
+            self.assertContains(response, 'client')
+
+    @override_settings(PERF_SAMPLE_RATE=1.0, PERF_SLOW_REQUEST_MS=10_000)
+    async def test_middleware_counts_async_queries(self):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        with self.assertLogs('gallery_app.performance', 'INFO') as logs:
+            await client.get('/booking/my/')
+
+        data = logs.records[0].performance
+        self.assertEqual(data['url_name'], 'gallery:user_bookings')
+        self.assertEqual(data['queries'], 3)
+
+
+class CountingHasher(MD5PasswordHasher):
+    """Быстрый хешер, который считает проверки паролей"""
+    verified = 0
+
+    def verify(self, password, encoded):
+        CountingHasher.verified += 1
+        return super().verify(password, encoded)
+
+
+@override_settings(PASSWORD_HASHERS=['gallery_app.tests.CountingHasher'])
+class AuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('client', 'Client@Example.com', 'pass12345')
+        CountingHasher.verified = 0
+
+    def test_login_checks_password_once(self):
+        response = self.client.post('/login/', {'username': 'client', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(CountingHasher.verified, 1)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+    def test_login_by_email_ignores_case(self):
+        response = self.client.post('/login/', {'username': 'client@example.COM', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.user.pk)
+        self.assertEqual(CountingHasher.verified, 1)
+
+    def test_wrong_credentials(self):
+        for username in ('client@example.com', 'missing@example.com'):
+            response = self.client.post('/login/', {'username': username, 'password': 'wrong-pass'})
+            self.assertEqual(response.status_code, 200)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_register_logs_in_without_authenticate(self):
+        response = self.client.post('/register/', {
+            'username': 'newbie', 'email': 'newbie@example.com',
+            'password1': 'Str0ng-pass-42', 'password2': 'Str0ng-pass-42',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(CountingHasher.verified, 0)
+        self.assertEqual(self.client.session['_auth_user_id'], str(User.objects.get(username='newbie').pk))
+
+    def test_register_rejects_email_in_other_case(self):
+        form = CustomUserCreationForm(data={
+            'username': 'other', 'email': 'CLIENT@example.com',
+            'password1': 'Str0ng-pass-42', 'password2': 'Str0ng-pass-42',
+        })
+        self.assertIn('email', form.errors)
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'план запроса SQLite')
+    def test_email_lookup_uses_index(self):
+        sql, params = users_with_email('client@example.com').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('gallery_user_email_lower_idx', plan)
+
+
+class SessionStorageTests(TestCase):
+    """Сессия, пользователь и сообщения не требуют запросов к БД на каждом запросе"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('client', 'client@example.com', 'pass12345')
+        make_booking(self.user, make_service(), datetime.date(2030, 1, 1))
+
+    def _assert_only_page_query(self):
+        self.client.force_login(self.user)
+        self.client.get('/booking/my/')
+        with self.assertNumQueries(1):
+            response = self.client.get('/booking/my/')
+        self.assertContains(response, 'client')
+
+    def test_cached_db_session(self):
+        self._assert_only_page_query()
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_session(self):
+        self._assert_only_page_query()
+
+    def test_password_change_invalidates_cached_user(self):
+        self._assert_only_page_query()
+        self.user.set_password('new-pass-123')
+        self.user.save()
+
+        response = self.client.get('/booking/my/')
+        self.assertRedirects(response, '/login/?next=/booking/my/', fetch_redirect_response=False)
+
+    def test_deactivated_user_is_logged_out(self):
+        self._assert_only_page_query()
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get('/booking/my/').status_code, 302)
+
+    def test_user_cached_before_commit_is_dropped(self):
+        self._assert_only_page_query()
+        stale = User.objects.get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+            # Параллельный запрос той же сессии до COMMIT кеширует прежнюю строку
+            cache.set(backends._user_key(self.user.pk), stale)
+
+        self.assertEqual(self.client.get('/booking/my/').status_code, 302)
+
+    def test_admin_action_deactivation_logs_user_out(self):
+        self._assert_only_page_query()
+        admin_user = User.objects.create_superuser('boss', 'boss@example.com', 'pass12345')
+        admin_client = Client()
+        admin_client.force_login(admin_user)
+        response = admin_client.post('/admin/auth/user/', {
+            'action': 'deactivate_users',
+            '_selected_action': [self.user.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+
+        response = self.client.get('/booking/my/')
+        self.assertRedirects(response, '/login/?next=/booking/my/', fetch_redirect_response=False)
+
+    def test_messages_stored_in_cookie(self):
+        response = self.client.post('/login/', {'username': 'client', 'password': 'pass12345'})
+        self.assertIn('messages', response.cookies)
+
+
+class DatabaseSettingsTests(TransactionTestCase):
+    """Прагмы SQLite, настройки из окружения и замер конкуренции"""
+
+    def _pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'прагмы SQLite')
+    def test_pragmas_applied_to_new_connections(self):
+        connection.close()
+        self.assertEqual(self._pragma('journal_mode'), 'wal')
+        self.assertEqual(self._pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self._pragma('busy_timeout'), database.SQLITE_PRAGMAS['busy_timeout'])
+
+    def test_postgresql_from_environment(self):
+        environ = {'DJANGO_DB_ENGINE': 'postgresql', 'DJANGO_DB_NAME': 'photos', 'DJANGO_DB_HOST': 'db'}
+        with mock.patch.dict(os.environ, environ):
+            persistent = database.database_settings(Path('/app'))
+            with mock.patch.dict(os.environ, {'DJANGO_DB_POOL_MAX_SIZE': '20'}):
+                pooled = database.database_settings(Path('/app'))
+
+        self.assertEqual(persistent['CONN_MAX_AGE'], 60)
+        self.assertNotIn('pool', persistent['OPTIONS'])
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+        self.assertEqual(pooled['OPTIONS']['pool']['max_size'], 20)
+        self.assertEqual((pooled['NAME'], pooled['HOST']), ('photos', 'db'))
+
+    def test_contention_benchmark(self):
+        make_service()
+        User.objects.create_user('client', 'client@example.com', 'pass12345')
+
+        result = benchmark.contention(writers=2, readers=2, duration=0.3)
+        for metrics in result['results'].values():
+            self.assertEqual(metrics['errors'], 0)
+            self.assertGreater(metrics['writes_per_second'], 0)
+            self.assertGreater(metrics['reads_per_second'], 0)
+        if connection.vendor == 'sqlite':
+            self.assertEqual(self._pragma('journal_mode'), 'wal')
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'реплика - копия файла SQLite')
+class ReplicaRouterTests(TransactionTestCase):
+    """Реплику изображает второй файл SQLite: копия схемы основной базы, данные свои"""
+
+    # Алиас replica появляется только в setUpClass, поэтому не перечисляется явно
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        path = str(Path(cls.replica_dir.name) / 'replica.sqlite3')
+        # Как при репликации: реплика начинается с копии основной базы
+        connection.ensure_connection()
+        replica = sqlite3.connect(path)
+        connection.connection.backup(replica)
+        replica.close()
+        connections.settings['replica'] = {**connections.settings['default'], 'NAME': path}
+        super().setUpClass()
+        cls.enterClassContext(override_settings(DATABASE_REPLICAS=['replica']))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.replica_dir.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        make_service(name='С основной базы')
+        Service.objects.using('replica').create(name='С реплики', description='', price=1, service_type='PHOTO')
+        self.user = User.objects.create_user('client', 'client@example.com', 'pass12345')
+
+    def test_read_only_view_reads_replica(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/prices/')
+        self.assertContains(response, 'С реплики')
+        self.assertNotContains(response, 'С основной базы')
+
+    def test_shared_page_cache_filled_from_primary(self):
+        response = self.client.get('/prices/')
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'С основной базы')
+
+    def test_shared_stats_cache_filled_from_primary(self):
+        # Реплика отстает: бронирование есть только на основной базе
+        make_booking(self.user, Service.objects.get(), datetime.date(2030, 1, 1))
+        self.client.force_login(User.objects.create_user('admin', 'admin@example.com', 'x', is_staff=True))
+        self.assertEqual(self.client.get('/admin/stats/').json()['total'], 1)
+        self.assertEqual(stats.get_admin_stats()['total'], 1)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/booking/my/stats/').json()['total'], 1)
+        self.assertEqual(stats.get_user_stats(self.user)['total'], 1)
+
+    def test_write_pins_client_to_primary(self):
+        booking = make_booking(self.user, Service.objects.get(), timezone.localdate() + datetime.timedelta(days=10))
+        self.client.force_login(self.user)
+
+        response = self.client.post(f'/booking/{booking.pk}/cancel/')
+        self.assertEqual(response.cookies[routers.PIN_COOKIE]['max-age'], settings.REPLICA_PIN_SECONDS)
+        self.assertContains(self.client.get('/prices/'), 'С основной базы')
+
+        del self.client.cookies[routers.PIN_COOKIE]
+        self.assertContains(self.client.get('/prices/'), 'С реплики')
+
+    def test_only_app_reads_inside_views_use_replica(self):
+        router = routers.ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Service))
+
+        token = routers._state.set(routers.RoutingState())
+        try:
+            with routers._override('replica', True):
+                self.assertEqual(router.db_for_read(Service), 'replica')
+                self.assertIsNone(router.db_for_read(User))
+                with routers.use_primary():
+                    self.assertIsNone(router.db_for_read(Service))
+        finally:
+            routers._state.reset(token)
+
+
+class BookingArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('client', 'client@example.com', 'pass12345')
+        self.service = make_service(name='Портрет', price=1000)
+        old = datetime.date(2020, 1, 1)
+        self.completed = make_booking(self.user, self.service, old, client_name='Анна Архивная')
+        transitions.bulk_transition(Booking.objects.filter(pk=self.completed.pk), 'completed')
+        make_booking(self.user, self.service, old + datetime.timedelta(days=1), status='cancelled')
+        make_booking(self.user, self.service, old + datetime.timedelta(days=2), status='rejected')
+        # Не переносятся: незавершенная и недавняя
+        make_booking(self.user, self.service, old, status='pending', booking_time=datetime.time(15, 0))
+        make_booking(self.user, self.service, timezone.now().date(), status='completed')
+        self.cutoff = archive.archive_cutoff()
+
+    def test_batches_move_rows_with_history(self):
+        self.assertEqual(archive.archive_batch(self.cutoff, batch_size=2), 2)
+        self.assertEqual(BookingArchive.objects.count(), 2)
+
+        out = io.StringIO()
+        call_command('archive_bookings', batch_size=2, stdout=out)
+        self.assertIn('перенесено 1', out.getvalue())
+        self.assertEqual(sorted(Booking.objects.values_list('status', flat=True)), ['completed', 'pending'])
+        self.assertEqual(BookingArchive.objects.count(), 3)
+        self.assertEqual(archive.archive_batch(self.cutoff), 0)
+
+        archived = BookingArchive.objects.get(pk=self.completed.pk)
+        self.assertEqual(archived.client_name, 'Анна Архивная')
+        self.assertEqual(archived.get_total_price(), 2000)
+        self.assertEqual([entry['new_status'] for entry in archived.history], ['completed'])
+        self.assertFalse(BookingHistory.objects.filter(booking_id=self.completed.pk).exists())
+        self.assertFalse(BookingSearchToken.objects.filter(booking_id=self.completed.pk).exists())
+        # Письмо о завершении остается в очереди без ссылки на бронирование
+        self.assertTrue(OutboxEmail.objects.filter(booking=None, to='client@example.com').exists())
+
+    def test_dry_run(self):
+        out = io.StringIO()
+        call_command('archive_bookings', dry_run=True, stdout=out)
+        self.assertIn('К переносу: 3', out.getvalue())
+        self.assertFalse(BookingArchive.objects.exists())
+
+    def test_user_history_appends_archive(self):
+        call_command('archive_bookings', stdout=io.StringIO())
+        self.client.force_login(self.user)
+
+        response = self.client.get('/booking/my/')
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+        self.assertNotContains(response, 'Анна Архивная')
+
+        response = self.client.get('/booking/my/', {'history': '1'})
+        rows = response.context['page_obj'].object_list
+        self.assertEqual(response.context['page_obj'].paginator.count, 5)
+        self.assertEqual([row.is_archived for row in rows], [False, False, True, True, True])
+        self.assertEqual(response.context['stats']['total'], 2)
+
+        response = self.client.get('/booking/my/', {'history': '1', 'status': 'completed'})
+        self.assertEqual(len(response.context['page_obj'].object_list), 2)
+
+    def test_user_history_boundary_ignores_stale_stats(self):
+        call_command('archive_bookings', stdout=io.StringIO())
+        self.client.force_login(self.user)
+        self.client.get('/booking/my/')
+        # Кеш статистики отстал от данных
+        cache.set(stats._user_stats_key(self.user.pk, timezone.now().date()),
+                  {**stats.get_user_stats(self.user), 'total': 1})
+
+        response = self.client.get('/booking/my/', {'history': '1'})
+        rows = response.context['page_obj'].object_list
+        self.assertEqual(len({row.pk for row in rows}), 5)
+        self.assertEqual([row.is_archived for row in rows], [False, False, True, True, True])
+
+    def test_admin_list_history(self):
+        call_command('archive_bookings', stdout=io.StringIO())
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pass12345'))
+
+        response = self.client.get('/admin/bookings/')
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+        self.assertNotContains(response, 'Анна Архивная')
+
+        response = self.client.get('/admin/bookings/', {'history': '1', 'search': 'анна'})
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+        self.assertContains(response, 'Анна Архивная')
+        self.assertContains(response, 'Архив</span>')
+
+    def test_chained_rows_pagination_and_search(self):
+        call_command('archive_bookings', stdout=io.StringIO())
+        rows = archive.ChainedRows(Booking.objects.order_by('booking_date'),
+                                   BookingArchive.objects.order_by('booking_date'))
+        paginator = Paginator(rows, 3)
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertEqual([row.is_archived for row in paginator.page(1)], [False, False, True])
+        self.assertEqual([row.is_archived for row in paginator.page(2)], [True, True])
+
+        found = search.search_bookings(BookingArchive.objects.all(), 'анна')
+        self.assertEqual(list(found.values_list('pk', flat=True)), [self.completed.pk])
+
+    def test_export_includes_archive_on_request(self):
+        call_command('archive_bookings', stdout=io.StringIO())
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client.force_login(admin)
+
+        def export(**params):
+            response = self.client.get('/admin/bookings/export/', params)
+            return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig')),
+                                   delimiter=';'))[1:]
+
+        self.assertEqual(len(export()), 2)
+        rows = export(history='1')
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0][2], '2020-01-01')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ConcurrentBookingTests(TransactionTestCase):
+    """Параллельные POST на create_booking против файловой SQLite"""
+
+    threads = 12
+
+    def setUp(self):
+        self.service = make_service(preparation_time=0, max_booking_hours=8)
+        self.day = datetime.date.today() + datetime.timedelta(days=10)
+        if self.day.weekday() in availability.CLOSED_WEEKDAYS:
+            self.day += datetime.timedelta(days=1)
+
+        self.clients = []
+        for i in range(self.threads):
+            user = User.objects.create_user(f'client{i}', f'client{i}@example.com', 'pass12345')
+            client = Client()
+            client.force_login(user)
+            self.clients.append(client)
+
+    def _hammer(self, times):
+        barrier = threading.Barrier(self.threads)
+        errors = []
+
+        def post(client, booking_time):
+            try:
+                barrier.wait()
+                client.post('/booking/create/', {
+                    'service': self.service.pk,
+                    'booking_date': self.day.isoformat(),
+                    'booking_time': booking_time,
+                    'duration': 1,
+                    'client_name': 'Клиент',
+                    'client_phone': '+7 999 000-00-00',
+                    'client_email': 'client@example.com',
+                    'confirm_terms': True,
+                })
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=post, args=(client, booking_time))
+                   for client, booking_time in zip(self.clients, times)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        return Booking.objects.filter(booking_date=self.day)
+
+    def test_daily_capacity_is_never_exceeded(self):
+        times = [f'{9 + i}:00' for i in range(self.threads)]
+        bookings = self._hammer(times)
+
+        self.assertEqual(bookings.count(), availability.MAX_BOOKINGS_PER_DAY)
+
+    def test_same_slot_is_booked_once(self):
+        bookings = self._hammer(['10:00'] * self.threads)
+
+        self.assertEqual(bookings.count(), 1)
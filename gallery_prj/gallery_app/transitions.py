@@ -0,0 +1,69 @@
+"""Смена статусов бронирований с журналом и уведомлениями.
+
+Массовый переход выполняется за постоянное число запросов независимо от
+количества бронирований: чтение текущих статусов, один UPDATE на целевой
+статус, bulk_create записей BookingHistory, пересчет индекса дней и
+постановка пачки писем в очередь в той же транзакции.
+"""
+from collections import namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Booking, BookingHistory
+from .notifications import enqueue_status_notifications
+from .signals import bookings_changed
+
+
+ALLOWED_TRANSITIONS = {
+    'pending': {'confirmed', 'rejected', 'cancelled'},
+    'confirmed': {'completed', 'rejected', 'cancelled'},
+    'rejected': set(),
+    'completed': set(),
+    'cancelled': set(),
+}
+
+TransitionResult = namedtuple('TransitionResult', ['updated', 'skipped'])
+
+
+def can_transition(old_status, new_status):
+    return new_status in ALLOWED_TRANSITIONS.get(old_status, ())
+
+
+def bulk_transition(queryset, status, user=None, notify=True):
+    """Перевод бронирований queryset в status; недопустимые переходы пропускаются"""
+    with transaction.atomic():
+        rows = list(
+            Booking.objects.filter(pk__in=queryset.values('pk'))
+            .select_for_update()
+            .order_by()
+            .values_list('id', 'status', 'booking_date', 'user_id')
+        )
+        allowed = [row for row in rows if can_transition(row[1], status)]
+        if not allowed:
+            return TransitionResult(0, len(rows))
+
+        ids = [row[0] for row in allowed]
+        Booking.objects.filter(id__in=ids).update(status=status, admin_user=user, updated_at=timezone.now())
+        BookingHistory.objects.bulk_create(
+            BookingHistory(booking_id=booking_id, old_status=old_status, new_status=status, changed_by=user)
+            for booking_id, old_status, _, _ in allowed
+        )
+        # update() обходит сигналы, поэтому производные данные обновляем здесь
+        bookings_changed({row[2] for row in allowed}, {row[3] for row in allowed})
+
+        if notify:
+            enqueue_status_notifications(Booking.objects.for_listing().filter(id__in=ids).order_by())
+    return TransitionResult(len(allowed), len(rows) - len(allowed))
+
+
+def record_transition(booking, old_status, user=None, notify=True):
+    """Журнал и письмо в очередь после сохранения одного бронирования"""
+    if booking.status == old_status:
+        return
+    with transaction.atomic():
+        BookingHistory.objects.create(
+            booking=booking, old_status=old_status, new_status=booking.status, changed_by=user
+        )
+        if notify:
+            enqueue_status_notifications([booking])
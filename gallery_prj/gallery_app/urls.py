@@ -11,6 +11,7 @@ urlpatterns = [
     path('prices/', views.prices_view, name='prices'),
     path('gallery/', views.gallery_view, name='gallery'),
     path('gallery/photo/<int:photo_id>/', views.photo_detail_view, name='photo_detail'),
+    path('gallery/api/photos/', views.gallery_api, name='gallery_api'),
 
 
     path('login/', CustomLoginView.as_view(), name='login'),
@@ -21,12 +22,17 @@ urlpatterns = [
 
     path('booking/create/', views.create_booking, name='create_booking'),
     path('booking/my/', views.user_bookings, name='user_bookings'),
+    path('booking/my/stats/', views.user_stats_api, name='user_stats_api'),
     path('booking/<uuid:booking_id>/cancel/', views.cancel_booking, name='cancel_booking'),
     path('booking/<uuid:booking_id>/delete/', views.delete_booking, name='delete_booking'),
 
 
     path('admin/bookings/', views.admin_booking_list, name='admin_booking_list'),
+    path('admin/stats/', views.admin_stats_api, name='admin_stats_api'),
+    path('admin/bookings/export/', views.admin_booking_export, name='admin_booking_export'),
     path('admin/bookings/<uuid:booking_id>/', views.admin_booking_detail, name='admin_booking_detail'),
     path('admin/calendar/', views.admin_calendar_view, name='admin_calendar'),
+    path('admin/calendar/feed.json', views.admin_calendar_json, name='admin_calendar_json'),
+    path('admin/calendar/feed.ics', views.admin_calendar_ics, name='admin_calendar_ics'),
 
 ]
\ No newline at end of file
@@ -1,34 +1,91 @@
-from django.contrib.auth import login, authenticate
+from django.contrib.auth import login
 from django.contrib.auth.views import LoginView
 from django.contrib import messages
 from django.contrib.auth.models import User
 from .forms import CustomUserCreationForm, CustomAuthenticationForm
-import time
+from .backends import users_with_email
 from django.contrib.auth import logout
 from django.utils import timezone
 from .forms import BookingForm, AdminBookingForm
+import asyncio
+import calendar
 import datetime
-from django.core.paginator import Paginator
-from .models import Booking, Service
+from django.core.paginator import Page, Paginator
+from django.utils.functional import cached_property
+from .models import Booking, BookingArchive, OutboxEmail, Photo, Service
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Q
-
-def home_view(request):
+from .availability import get_available_dates
+from . import booking_calendar, exports, reservations
+from .archive import ChainedRows, achained_rows
+from .transitions import record_transition
+from .profiling import track
+from .stats import aget_admin_stats, aget_user_stats, get_admin_stats
+from .search import search_bookings
+from .photos import (aget_photo_page, get_photo_page, serialize_photo, InvalidCursor,
+                     PAGE_SIZE as PHOTO_PAGE_SIZE, MAX_PAGE_SIZE as MAX_PHOTO_PAGE_SIZE)
+from .images import load_manifest
+from django.http import Http404, HttpResponse, JsonResponse
+from . import page_cache
+from .page_cache import cached_page
+from .routers import read_replica
+from .counters import aget_user_count, get_user_count
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+GALLERY_PAGE_SIZE = 24
+USER_BOOKINGS_PER_PAGE = 10
+
+
+def _wants_history(request):
+    """Архив читается только по явному запросу истории"""
+    return request.GET.get('history') == '1'
+
+
+def _page_number(request):
     try:
-        user_count = User.objects.count()
-    except:
-        user_count = 0
+        return max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        return 1
+
+
+async def _load_user(request):
+    """Шаблоны обращаются к request.user: загружаем его заранее, без синхронного запроса к БД"""
+    request.user = await request.auser()
+
+
+async def _page_rows(queryset, number, per_page):
+    offset = (number - 1) * per_page
+    return [row async for row in queryset[offset:offset + per_page]]
+
+
+async def get_gallery_page(request):
+    """Страница опубликованных фотографий по индексу (is_published, order, id)"""
+    photos = Photo.objects.published().only('id', 'title', 'image', 'dominant_color')
+    paginator = KnownCountPaginator(photos, GALLERY_PAGE_SIZE, count=await photos.acount())
+    number = min(_page_number(request), paginator.num_pages)
+    return Page(await _page_rows(photos, number, GALLERY_PAGE_SIZE), number, paginator)
+
 
+@cached_page(page_cache.GALLERY)
+async def home_view(request):
+    await _load_user(request)
+    # Счетчик и страница галереи не зависят друг от друга
+    user_count, page_obj = await asyncio.gather(aget_user_count(), get_gallery_page(request))
     context = {
         'user_count': user_count,
+        'page_obj': page_obj,
+        'photos': page_obj.object_list,
     }
     return render(request, 'home.html', context)
 
 
 
-def prices_view(request):
-    services = Service.objects.filter(is_active=True)
+@cached_page(page_cache.PRICES)
+@read_replica
+async def prices_view(request):
+    await _load_user(request)
+    services = [service async for service in Service.objects.filter(is_active=True)]
     services_by_type = {}
     for service in services:
         if service.service_type not in services_by_type:
@@ -42,13 +99,45 @@ def prices_view(request):
 
 
 
-def gallery_view(request):
-    return render(request, 'gallery.html')
+@cached_page(page_cache.GALLERY)
+@read_replica
+async def gallery_view(request):
+    await _load_user(request)
+    # Первая страница рендерится сразу, остальные подгружаются через gallery_api
+    photos, next_cursor = await aget_photo_page()
+    return render(request, 'gallery.html', {'photos': photos, 'next_cursor': next_cursor})
+
+
+
+@cached_page(page_cache.GALLERY)
+@read_replica
+def gallery_api(request):
+    """JSON-страница фотографий для бесконечной прокрутки"""
+    try:
+        limit = min(max(int(request.GET.get('limit', PHOTO_PAGE_SIZE)), 1), MAX_PHOTO_PAGE_SIZE)
+    except ValueError:
+        limit = PHOTO_PAGE_SIZE
 
+    try:
+        photos, next_cursor = get_photo_page(request.GET.get('after'), limit)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Некорректный курсор'}, status=400)
+
+    manifest = load_manifest()
+    return JsonResponse({
+        'results': [serialize_photo(photo, manifest) for photo in photos],
+        'next': next_cursor,
+    })
 
 
-def photo_detail_view(request, photo_id):
-    return render(request, 'photo_detail.html', {'photo_id': photo_id})
+
+@cached_page(page_cache.GALLERY)
+async def photo_detail_view(request, photo_id):
+    try:
+        photo = await Photo.objects.published().prefetch_related('tags').aget(id=photo_id)
+    except Photo.DoesNotExist:
+        raise Http404('Фотография не найдена')
+    return render(request, 'photo_detail.html', {'photo': photo})
 
 
 
@@ -58,35 +147,13 @@ class CustomLoginView(LoginView):
     redirect_authenticated_user = True
 
     def form_valid(self, form):
-        start_time = time.time()
-
-        username = form.cleaned_data.get('username')
-        password = form.cleaned_data.get('password')
-        user = authenticate(self.request, username=username, password=password)
-
-        if user is not None:
-            login(self.request, user)
-            end_time = time.time()
-
-            print(f"[DEBUG] Авторизация пользователя {username} заняла {end_time - start_time:.4f} секунд")
-
-            # Обновляем last_login
-            if hasattr(user, 'last_login'):
-                from django.utils import timezone
-                user.last_login = timezone.now()
-                user.save(update_fields=['last_login'])
-
-            messages.success(self.request, f'Добро пожаловать, {user.username}!')
-            return super().form_valid(form)
-
-        return self.form_invalid(form)
+        # Пользователь уже проверен формой; last_login обновляет сигнал user_logged_in
+        messages.success(self.request, f'Добро пожаловать, {form.get_user().username}!')
+        return super().form_valid(form)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        try:
-            context['total_users'] = User.objects.count()
-        except:
-            context['total_users'] = 0
+        context['total_users'] = get_user_count()
         return context
 
 
@@ -96,30 +163,17 @@ def register_view(request):
         form = CustomUserCreationForm(request.POST)
 
         if form.is_valid():
-            start_time = time.time()
-
-            user = form.save()
+            with track('register'):
+                user = form.save()
 
-            username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password1')
-            user = authenticate(username=username, password=password)
-
-            if user is not None:
-                login(request, user)
-                end_time = time.time()
-
-                print(f"[DEBUG] Регистрация пользователя {username} заняла {end_time - start_time:.4f} секунд")
-                print(f"[DEBUG] Создан пользователь с ID: {user.id}")
-
-                messages.success(request, f'Аккаунт успешно создан для {username}!')
-                return redirect('../home')
+            # Пароль только что задан, повторная проверка хеша через authenticate() не нужна
+            login(request, user, backend='gallery_app.backends.EmailBackend')
+            messages.success(request, f'Аккаунт успешно создан для {user.username}!')
+            return redirect('../home')
     else:
         form = CustomUserCreationForm()
 
-    try:
-        total_users = User.objects.count()
-    except:
-        total_users = 0
+    total_users = get_user_count()
 
     context = {
         'form': form,
@@ -150,8 +204,7 @@ def profile_view(request):
 
         if email and email != user.email:
 
-            from django.contrib.auth.models import User
-            if not User.objects.filter(email=email).exclude(id=user.id).exists():
+            if not users_with_email(email).exclude(id=user.id).exists():
                 user.email = email
                 user.save()
                 messages.success(request, 'Email успешно обновлен!')
@@ -196,95 +249,134 @@ def custom_logout_view(request):
     return redirect('/home/')
 
 @login_required
-def user_bookings(request):
+async def user_bookings(request):
     """Список бронирований пользователя"""
-    bookings = Booking.objects.filter(user=request.user).order_by('-created_at')
+    await _load_user(request)
+    bookings = Booking.objects.for_listing().filter(user=request.user).order_by('-created_at')
+    history = _wants_history(request)
+    archived = BookingArchive.objects.for_listing().filter(user=request.user).order_by('-created_at')
 
     # Фильтрация по статусу
     status_filter = request.GET.get('status')
     if status_filter:
         bookings = bookings.filter(status=status_filter)
-
-    # Пагинация
-    paginator = Paginator(bookings, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-
-    # Статистика
-    stats = {
-        'total': bookings.count(),
-        'pending': bookings.filter(status='pending').count(),
-        'confirmed': bookings.filter(status='confirmed').count(),
-        'upcoming': bookings.filter(
-            status='confirmed',
-            booking_date__gte=timezone.now().date()
-        ).count(),
-    }
+        archived = archived.filter(status=status_filter)
+
+    number = _page_number(request)
+    per_page = USER_BOOKINGS_PER_PAGE
+
+    # Статистика по всем бронированиям пользователя (от фильтра не зависит)
+    # читается одновременно со строками страницы, а в истории - с точными
+    # количествами: граница между таблицами по кешу статистики могла бы
+    # разойтись с данными и повторить или пропустить строки
+    rows = None
+    if history:
+        stats, count, archived_count = await asyncio.gather(
+            aget_user_stats(request.user), bookings.acount(), archived.acount()
+        )
+    else:
+        stats, rows = await asyncio.gather(
+            aget_user_stats(request.user), _page_rows(bookings, number, per_page)
+        )
+        # Пагинация: количество уже известно из статистики
+        count, archived_count = stats['total'], 0
+        if status_filter:
+            count = stats[status_filter] if status_filter in dict(Booking.STATUS_CHOICES) else 0
+
+    paginator = KnownCountPaginator(bookings, per_page, count=count + archived_count)
+    if rows is None or number > paginator.num_pages:
+        number = min(number, paginator.num_pages)
+        if history:
+            rows = await achained_rows(bookings, count, archived, (number - 1) * per_page, per_page)
+        else:
+            rows = await _page_rows(bookings, number, per_page)
+    page_obj = Page(rows, number, paginator)
 
     context = {
         'page_obj': page_obj,
         'stats': stats,
         'status_filter': status_filter,
+        'history': history,
         'title': 'Мои бронирования',
     }
     return render(request, 'user_bookings.html', context)
 
 
+@login_required
+@read_replica
+async def user_stats_api(request):
+    """Счетчики бронирований пользователя в JSON"""
+    return JsonResponse(await aget_user_stats(await request.auser()))
+
+
+
 
+class KnownCountPaginator(Paginator):
+    """Пагинатор с заранее известным количеством строк, без отдельного COUNT"""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
+
+    @cached_property
+    def count(self):
+        return self._known_count
 
 
 def is_admin(user):
     return user.is_authenticated and (user.is_staff or user.is_superuser)
 
 
-@login_required
-@user_passes_test(is_admin)
-def admin_booking_list(request):
-    """Список всех бронирований для администратора"""
-    bookings = Booking.objects.all().order_by('-created_at')
+def _parse_date(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
 
-    # Фильтрация
+
+def filter_bookings(request, bookings):
+    """Фильтры списка бронирований из параметров запроса"""
     status_filter = request.GET.get('status')
-    date_filter = request.GET.get('date')
     search_query = request.GET.get('search')
+    filter_date = _parse_date(request.GET.get('date'))
+    # Диапазон дат съемки [start, end] для выгрузок за период
+    start, end = _parse_date(request.GET.get('start')), _parse_date(request.GET.get('end'))
 
     if status_filter:
         bookings = bookings.filter(status=status_filter)
+    if filter_date:
+        bookings = bookings.filter(booking_date=filter_date)
+    if start:
+        bookings = bookings.filter(booking_date__gte=start)
+    if end:
+        bookings = bookings.filter(booking_date__lte=end)
+    if search_query:
+        bookings = search_bookings(bookings, search_query)
+    return bookings
 
-    if date_filter:
-        try:
-            filter_date = datetime.datetime.strptime(date_filter, '%Y-%m-%d').date()
-            bookings = bookings.filter(booking_date=filter_date)
-        except ValueError:
-            pass
 
-    if search_query:
-        bookings = bookings.filter(
-            Q(client_name__icontains=search_query) |
-            Q(client_phone__icontains=search_query) |
-            Q(client_email__icontains=search_query) |
-            Q(service__name__icontains=search_query)
+@login_required
+@user_passes_test(is_admin)
+def admin_booking_list(request):
+    """Список всех бронирований для администратора"""
+    bookings = filter_bookings(request, Booking.objects.for_listing().order_by('-created_at'))
+    history = _wants_history(request)
+    if history:
+        bookings = ChainedRows(
+            bookings, filter_bookings(request, BookingArchive.objects.for_listing().order_by('-created_at'))
         )
 
+    status_filter = request.GET.get('status')
+    date_filter = request.GET.get('date')
+    search_query = request.GET.get('search')
+
     # Пагинация
     paginator = Paginator(bookings, 20)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
     # Статистика
-    today = timezone.now().date()
-    stats = {
-        'total': Booking.objects.count(),
-        'pending': Booking.objects.filter(status='pending').count(),
-        'today': Booking.objects.filter(booking_date=today, status='confirmed').count(),
-        'upcoming': Booking.objects.filter(
-            booking_date__gte=today,
-            status='confirmed'
-        ).count(),
-        'revenue': sum(b.get_total_price() for b in Booking.objects.filter(
-            status__in=['confirmed', 'completed']
-        ) if b.get_total_price()),
-    }
+    stats = get_admin_stats()
 
     context = {
         'page_obj': page_obj,
@@ -293,11 +385,35 @@ def admin_booking_list(request):
             'status': status_filter,
             'date': date_filter,
             'search': search_query,
+            'history': history,
         },
         'title': 'Управление бронированиями',
     }
     return render(request, 'booking/admin_list.html', context)
 
+@login_required
+@user_passes_test(is_admin)
+@read_replica
+async def admin_stats_api(request):
+    """Статистика бронирований и длина очереди писем в JSON"""
+    stats, outbox = await asyncio.gather(
+        aget_admin_stats(),
+        OutboxEmail.objects.filter(status='pending').acount(),
+    )
+    return JsonResponse({**stats, 'outbox_pending': outbox})
+
+@login_required
+@user_passes_test(is_admin)
+@read_replica
+def admin_booking_export(request):
+    """Выгрузка отфильтрованных бронирований в CSV или XLSX"""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in exports.FORMATS:
+        return HttpResponse('Формат должен быть csv или xlsx', status=400,
+                            content_type='text/plain; charset=utf-8')
+    archived = filter_bookings(request, BookingArchive.objects.all()) if _wants_history(request) else None
+    return exports.export_response(filter_bookings(request, Booking.objects.all()), export_format, archived)
+
 @login_required
 @user_passes_test(is_admin)
 def admin_booking_detail(request, booking_id):
@@ -305,6 +421,7 @@ def admin_booking_detail(request, booking_id):
     booking = get_object_or_404(Booking, id=booking_id)
 
     if request.method == 'POST':
+        old_status = booking.status
         form = AdminBookingForm(request.POST, instance=booking)
         if form.is_valid():
             updated_booking = form.save(commit=False)
@@ -313,90 +430,111 @@ def admin_booking_detail(request, booking_id):
             if form.has_changed() and 'status' in form.changed_data:
                 updated_booking.admin_user = request.user
 
-            updated_booking.save()
+            # Письмо уходит в очередь в той же транзакции, что и изменение
+            with transaction.atomic():
+                updated_booking.save()
+                record_transition(updated_booking, old_status, user=request.user)
 
             messages.success(request, 'Бронирование обновлено.')
 
-            # Отправка уведомления пользователю при изменении статуса
-            if 'status' in form.changed_data:
-                # send_booking_status_update_email(booking)
-                pass
-
             return redirect('admin_booking_detail', booking_id=booking_id)
     else:
         form = AdminBookingForm(instance=booking)
 
-    # История изменений (можно добавить модель History позже)
-    # history = BookingHistory.objects.filter(booking=booking).order_by('-created_at')
+    history = booking.history.select_related('changed_by')
 
     context = {
         'booking': booking,
         'form': form,
-        # 'history': history,
+        'history': history,
         'title': f'Бронирование #{booking.id}',
     }
     return render(request, 'booking/admin_detail.html', context)
 
 @login_required
 @user_passes_test(is_admin)
+@read_replica
 def admin_calendar_view(request):
+    """Календарь подтвержденных бронирований: месяц, неделя или день"""
+    today = timezone.localdate()
+    view = request.GET.get('view', booking_calendar.MONTH)
+    if view not in booking_calendar.VIEWS:
+        view = booking_calendar.MONTH
 
-    year = request.GET.get('year')
-    month = request.GET.get('month')
-
-    if year and month:
-        try:
-            year = int(year)
-            month = int(month)
-        except ValueError:
-            year = timezone.now().year
-            month = timezone.now().month
-    else:
-        year = timezone.now().year
-        month = timezone.now().month
-
-    start_date = datetime.date(year, month, 1)
-    if month == 12:
-        end_date = datetime.date(year + 1, 1, 1)
-    else:
-        end_date = datetime.date(year, month + 1, 1)
-
-    bookings = Booking.objects.filter(
-        booking_date__gte=start_date,
-        booking_date__lt=end_date,
-        status='confirmed'
-    ).order_by('booking_date', 'booking_time')
-
-    bookings_by_day = {}
-    for booking in bookings:
-        day = booking.booking_date.day
-        if day not in bookings_by_day:
-            bookings_by_day[day] = []
-        bookings_by_day[day].append(booking)
-
-    import calendar
-    cal = calendar.monthcalendar(year, month)
+    try:
+        day = datetime.date.fromisoformat(request.GET['date']) if request.GET.get('date') else None
+    except ValueError:
+        day = None
+    try:
+        year = int(request.GET.get('year', ''))
+        month = int(request.GET.get('month', ''))
+        datetime.date(year, month, 1)
+    except ValueError:
+        year, month = (day or today).year, (day or today).month
+    day = day or (today if (year, month) == (today.year, today.month) else datetime.date(year, month, 1))
 
-    prev_month = month - 1 if month > 1 else 12
-    prev_year = year if month > 1 else year - 1
-    next_month = month + 1 if month < 12 else 1
-    next_year = year if month < 12 else year + 1
+    month_start, month_end = booking_calendar.month_bounds(year, month)
+    prev_month = month_start - datetime.timedelta(days=1)
 
     context = {
-        'calendar': cal,
+        'view': view,
         'year': year,
         'month': month,
         'month_name': calendar.month_name[month],
-        'bookings_by_day': bookings_by_day,
-        'prev_month': prev_month,
-        'prev_year': prev_year,
-        'next_month': next_month,
-        'next_year': next_year,
-        'today': timezone.now().date(),
+        'day': day,
+        'prev_month': prev_month.month,
+        'prev_year': prev_month.year,
+        'next_month': month_end.month,
+        'next_year': month_end.year,
+        'today': today,
         'title': 'Календарь бронирований',
     }
+    if view == booking_calendar.MONTH:
+        context['weeks'] = booking_calendar.month_view(year, month)
+    elif view == booking_calendar.WEEK:
+        context['days'] = booking_calendar.week_view(day)
+    else:
+        context['bookings'] = booking_calendar.day_view(day)
     return render(request, 'booking/admin_calendar.html', context)
 
+
+def _feed_range(request):
+    return booking_calendar.parse_range(request.GET.get('start'), request.GET.get('end'))
+
+
+@login_required
+@user_passes_test(is_admin)
+@read_replica
+def admin_calendar_json(request):
+    """Сводка дней календаря в JSON"""
+    try:
+        start, end = _feed_range(request)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    summaries = booking_calendar.get_summaries(start, end)
+    return JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'days': [summaries[day].as_dict() for day in sorted(summaries)],
+    })
+
+
+@login_required
+@user_passes_test(is_admin)
+@read_replica
+def admin_calendar_ics(request):
+    """Подтвержденные бронирования в формате iCalendar"""
+    try:
+        start, end = _feed_range(request)
+    except ValueError as error:
+        return HttpResponse(str(error), status=400, content_type='text/plain; charset=utf-8')
+
+    content = booking_calendar.to_ical(booking_calendar.get_bookings(start, end), request.get_host())
+    response = HttpResponse(content, content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="bookings.ics"'
+    return response
+
 @login_required
 def create_booking(request):
     """Создание нового бронирования"""
@@ -413,21 +551,25 @@ def create_booking(request):
             if not booking.client_email and request.user.is_authenticated:
                 booking.client_email = request.user.email
 
-            booking.save()
+            try:
+                # Место на дату резервируется атомарно вместе с сохранением
+                reservations.reserve(booking)
+            except ValidationError as e:
+                form.add_error(None, e)
+            else:
+                messages.success(request,
+                                 '✅ Бронирование успешно создано! '
+                                 'Мы свяжемся с вами в течение 24 часов для подтверждения.'
+                                 )
 
-            messages.success(request,
-                             '✅ Бронирование успешно создано! '
-                             'Мы свяжемся с вами в течение 24 часов для подтверждения.'
-                             )
+                return redirect('/booking/my/')  # Изменено на абсолютный путь
 
-            return redirect('/booking/my/')  # Изменено на абсолютный путь
-        else:
-            # Если форма невалидна, показываем ошибки
-            available_dates = Booking.get_available_dates()
-            return render(request, 'create_booking.html', {
-                'form': form,
-                'available_dates': available_dates
-            })
+        # Если форма невалидна, показываем ошибки
+        available_dates = get_available_dates()
+        return render(request, 'create_booking.html', {
+            'form': form,
+            'available_dates': available_dates
+        })
     else:
         # GET запрос - показываем пустую форму
         form = BookingForm(request=request)
@@ -487,58 +629,15 @@ def cancel_booking(request, booking_id):
         return redirect(f'/booking/{booking_id}/')  # Изменено на абсолютный путь
 
     if request.method == 'POST':
+        old_status = booking.status
         booking.status = 'cancelled'
-        booking.save()
+        with transaction.atomic():
+            booking.save()
+            record_transition(booking, old_status, user=request.user)
 
         messages.warning(request, 'Бронирование отменено.')
-        # send_booking_cancellation_email(booking)  # Отправка уведомления
 
         return redirect('/booking/my/')  # Изменено на абсолютный путь
 
     # Если GET запрос, показываем страницу подтверждения
     return render(request, 'cancel_confirmation.html', {'booking': booking})
-
-def get_available_dates():
-    """Получение доступных дат для бронирования"""
-    from datetime import timedelta
-
-    available_dates = []
-    today = timezone.now().date()
-
-    # Бронирование доступно на 3 месяца вперед
-    end_date = today + timedelta(days=90)
-
-    current_date = today + timedelta(days=2)  # Минимум за 48 часов
-
-    while current_date <= end_date:
-        # Исключаем воскресенья
-        if current_date.weekday() != 6:
-            # Проверяем, не слишком ли много бронирований на этот день
-            # (можно ограничить, например, 2 бронированиями в день)
-            bookings_count = Booking.objects.filter(
-                booking_date=current_date,
-                status__in=['confirmed', 'pending']
-            ).count()
-
-            if bookings_count < 3:  # Максимум 3 съемки в день
-                available_dates.append(current_date)
-
-        current_date += timedelta(days=1)
-
-    return available_dates
-
-
-def check_date_availability(date):
-    """Проверка доступности даты"""
-    # Получаем все подтвержденные бронирования на эту дату
-    bookings = Booking.objects.filter(
-        booking_date=date,
-        status__in=['confirmed']
-    )
-    total_hours = sum(booking.duration for booking in bookings)
-
-    return total_hours < 8
-
-
-
-
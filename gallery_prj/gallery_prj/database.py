@@ -0,0 +1,107 @@
+"""Настройки базы данных из окружения.
+
+По умолчанию - файловая SQLite. На каждом новом соединении configure_sqlite
+включает WAL (читатели не ждут писателя), busy_timeout, synchronous=NORMAL
+(в режиме WAL безопасно для целостности) и увеличенные кеш страниц и mmap.
+Набор прагм задается настройкой SQLITE_PRAGMAS. Обработчик подключается к
+connection_created в GalleryAppConfig.ready(), а не при импорте настроек.
+
+Режим WAL записывается в заголовок файла базы, поэтому db.sqlite3 и файлы
+-wal/-shm не хранятся в git: локальная база создается командой migrate,
+которая заводит и исходный список услуг (миграция 0014_default_services).
+
+DJANGO_DB_ENGINE=postgresql переключает на PostgreSQL: постоянные соединения
+(DJANGO_DB_CONN_MAX_AGE) или пул psycopg 3 (DJANGO_DB_POOL_MAX_SIZE > 0).
+
+DJANGO_DB_REPLICAS - реплики для чтения через запятую: хосты PostgreSQL или
+файлы SQLite. Остальные параметры реплики берутся у основной базы.
+"""
+import os
+
+from django.conf import settings
+
+
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('DJANGO_SQLITE_JOURNAL_MODE', 'WAL'),
+    'busy_timeout': int(os.environ.get('DJANGO_SQLITE_BUSY_TIMEOUT_MS', '20000')),
+    'synchronous': os.environ.get('DJANGO_SQLITE_SYNCHRONOUS', 'NORMAL'),
+    # Отрицательное значение - размер в КБ, а не в страницах
+    'cache_size': int(os.environ.get('DJANGO_SQLITE_CACHE_KB', '65536')) * -1,
+    'mmap_size': int(os.environ.get('DJANGO_SQLITE_MMAP_MB', '256')) * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def _env(name, default=None):
+    return os.environ.get(f'DJANGO_DB_{name}', default)
+
+
+def database_settings(base_dir):
+    """DATABASES['default'] по переменным окружения DJANGO_DB_*"""
+    engine = _env('ENGINE', 'sqlite')
+    if engine == 'postgresql':
+        return _postgresql_settings()
+    if engine != 'sqlite':
+        raise ValueError(f'DJANGO_DB_ENGINE: неизвестный движок {engine!r}')
+
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': _env('NAME', base_dir / 'db.sqlite3'),
+        # Соединение с прагмами переиспользуется между запросами потока
+        'CONN_MAX_AGE': int(_env('CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Транзакция сразу берет блокировку на запись, без гонки за ее повышение
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+        },
+        'TEST': {
+            # Файловая БД, чтобы тесты с параллельными потоками видели одни данные
+            'NAME': base_dir / 'test_db.sqlite3',
+        },
+    }
+
+
+def _postgresql_settings():
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': _env('NAME', 'gallery'),
+        'USER': _env('USER', ''),
+        'PASSWORD': _env('PASSWORD', ''),
+        'HOST': _env('HOST', ''),
+        'PORT': _env('PORT', ''),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+    pool_size = int(_env('POOL_MAX_SIZE', '0'))
+    if pool_size:
+        # Пул несовместим с постоянными соединениями: соединение возвращается в пул
+        # в конце запроса
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': int(_env('POOL_MIN_SIZE', '2')),
+            'max_size': pool_size,
+            'timeout': float(_env('POOL_TIMEOUT', '10')),
+        }
+    else:
+        config['CONN_MAX_AGE'] = int(_env('CONN_MAX_AGE', '60'))
+    return config
+
+
+def replica_settings(primary):
+    """Алиасы replica1, replica2, ... с параметрами основной базы"""
+    replicas = [value.strip() for value in _env('REPLICAS', '').split(',') if value.strip()]
+    field = 'HOST' if primary['ENGINE'] == 'django.db.backends.postgresql' else 'NAME'
+    return {
+        # В тестах реплика - зеркало тестовой основной базы
+        f'replica{number}': {**primary, field: value, 'TEST': {'MIRROR': 'default'}}
+        for number, value in enumerate(replicas, 1)
+    }
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', SQLITE_PRAGMAS).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from . import database
+from .database import database_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'gallery_app.profiling.PerformanceMiddleware',
+    'gallery_app.routers.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,13 +79,65 @@ WSGI_APPLICATION = 'gallery_prj.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite с WAL и прагмами или PostgreSQL с пулом соединений, см. database.py
 DATABASES = {
+    'default': database_settings(BASE_DIR),
+}
+SQLITE_PRAGMAS = database.SQLITE_PRAGMAS
+
+# Чтения view с @read_replica уходят на реплики (gallery_app/routers.py);
+# после записи клиент на REPLICA_PIN_SECONDS закрепляется за основной базой
+DATABASES.update(database.replica_settings(DATABASES['default']))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['gallery_app.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('DJANGO_REPLICA_PIN_SECONDS', '10'))
+
+# Кеш: в разработке локальная память процесса, в продакшене backend из окружения
+# (например, django.core.cache.backends.redis.RedisCache)
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'photogal'),
     }
 }
 
+# Время жизни кеша публичных страниц; актуальность обеспечивают сигналы моделей
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Сессии читаются из кеша, в БД идет только запись (cached_db); для работы совсем
+# без БД - DJANGO_SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies.
+# С несколькими процессами кеш должен быть общим, иначе выход из аккаунта
+# не сразу виден другим процессам
+SESSION_ENGINE = os.environ.get('DJANGO_SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+# Сообщения в cookie: messages.success() не заставляет сохранять сессию
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+# Пользователь сессии кешируется EmailBackend.get_user; сбрасывается сигналами User
+USER_CACHE_TTL = int(os.environ.get('DJANGO_USER_CACHE_TTL', '300'))
+
+# Замеры запросов (gallery_app.profiling): доля запросов с полными метриками,
+# порог медленного запроса и вывод метрик в заголовок Server-Timing
+PERF_SAMPLE_RATE = float(os.environ.get('DJANGO_PERF_SAMPLE_RATE', '0.1'))
+PERF_SLOW_REQUEST_MS = int(os.environ.get('DJANGO_PERF_SLOW_REQUEST_MS', '500'))
+PERF_SERVER_TIMING = DEBUG
+
+# В тестах выборочные замеры выключены, см. test_runner.py
+TEST_RUNNER = 'gallery_prj.test_runner.TestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'gallery_app.performance': {
+            'handlers': ['console'],
+            'level': os.environ.get('DJANGO_PERF_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Настройки аутентификации - УЖЕ должны быть
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -96,6 +154,9 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Вход по имени пользователя или email, пароль проверяется один раз
+AUTHENTICATION_BACKENDS = ['gallery_app.backends.EmailBackend']
+
 # Ваши настройки аутентификации
 LOGIN_REDIRECT_URL = '/home'      # куда перенаправлять после входа
 LOGOUT_REDIRECT_URL = '/'         # куда перенаправлять после выхода - ОБЯЗАТЕЛЬНО!
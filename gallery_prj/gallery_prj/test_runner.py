@@ -0,0 +1,23 @@
+"""Запуск тестов без выборочных замеров производительности в выводе"""
+import logging
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # Тесты PerformanceMiddleware включают замеры сами через override_settings
+        self._perf_settings = override_settings(PERF_SAMPLE_RATE=0)
+        self._perf_settings.enable()
+        # Медленные запросы логируются всегда; нагрузочные тесты не должны засорять вывод.
+        # assertLogs на время проверки выставляет уровень логгера сам
+        self._perf_logger = logging.getLogger('gallery_app.performance')
+        self._perf_log_level = self._perf_logger.level
+        self._perf_logger.setLevel(logging.CRITICAL)
+
+    def teardown_test_environment(self, **kwargs):
+        self._perf_logger.setLevel(self._perf_log_level)
+        self._perf_settings.disable()
+        super().teardown_test_environment(**kwargs)
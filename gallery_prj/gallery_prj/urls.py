@@ -18,6 +18,8 @@ from django.contrib import admin
 from django.urls import path, include
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    # Приложение первым: его страницы admin/bookings/ и admin/calendar/
+    # иначе перехватывает catch-all встроенной админки
     path('', include('gallery_app.urls')),  # все URL из приложения
+    path('admin/', admin.site.urls),
 ]
\ No newline at end of file